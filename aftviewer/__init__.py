@@ -1,25 +1,74 @@
-from logging import getLogger
-
-from pymeflib.color import FG, BG, FG256, BG256, END
-from .core.types import Args, ReturnMessage
-from .core import GLOBAL_CONF
-from .core import (get_config, args_chk, cprint, print_key, get_col,
-                   set_numpy_format, interactive_view, run_system_cmd,
-                   print_error, print_warning)
-from .core.image_viewer import is_image, show_image_file, show_image_ndarray
-from .core.helpmsg import (help_template,
-                           add_args_imageviewer, add_args_encoding,
-                           add_args_output, add_args_verbose, add_args_key,
-                           add_args_interactive, add_args_cui,
-                           add_args_specification)
-logger = getLogger(GLOBAL_CONF.logname)
-
-try:
-    from .core.cui import interactive_cui
-except ImportError as e:
-    logger.error(e)
-
-    def interactive_cui(*args, **kwargs):
-        print('failed to import the interactive_cui function.')
-        print('maybe the curses module is not available.')
-        return
+from importlib import import_module
+from typing import Any
+
+# The attributes are imported at the first access (PEP 562)
+# to keep the start-up time of the command line tools short.
+# attribute name -> module name
+__lazy_attrs = {
+    'FG': 'pymeflib.color',
+    'BG': 'pymeflib.color',
+    'FG256': 'pymeflib.color',
+    'BG256': 'pymeflib.color',
+    'END': 'pymeflib.color',
+    'Args': '.core.types',
+    'ReturnMessage': '.core.types',
+    'GLOBAL_CONF': '.core',
+    'get_config': '.core',
+    'args_chk': '.core',
+    'cprint': '.core',
+    'print_key': '.core',
+    'get_col': '.core',
+    'set_numpy_format': '.core',
+    'interactive_view': '.core',
+    'run_system_cmd': '.core',
+    'print_error': '.core',
+    'print_warning': '.core',
+    'limited_pformat': '.core',
+    'cache_show_func': '.core',
+    'ContentsCache': '.core.cache',
+    'is_image': '.core.image_viewer',
+    'show_image_file': '.core.image_viewer',
+    'show_image_ndarray': '.core.image_viewer',
+    'help_template': '.core.helpmsg',
+    'add_args_imageviewer': '.core.helpmsg',
+    'add_args_encoding': '.core.helpmsg',
+    'add_args_output': '.core.helpmsg',
+    'add_args_verbose': '.core.helpmsg',
+    'add_args_key': '.core.helpmsg',
+    'add_args_interactive': '.core.helpmsg',
+    'add_args_cui': '.core.helpmsg',
+    'add_args_specification': '.core.helpmsg',
+}
+
+
+def __load_interactive_cui():
+    try:
+        from .core.cui import interactive_cui
+    except ImportError as e:
+        __getattr__('logger').error(e)
+
+        def interactive_cui(*args, **kwargs):
+            print('failed to import the interactive_cui function.')
+            print('maybe the curses module is not available.')
+            return
+    return interactive_cui
+
+
+def __getattr__(name: str) -> Any:
+    if name in __lazy_attrs:
+        mod = import_module(__lazy_attrs[name], __name__)
+        res = getattr(mod, name)
+    elif name == 'interactive_cui':
+        res = __load_interactive_cui()
+    elif name == 'logger':
+        from logging import getLogger
+        res = getLogger(__getattr__('GLOBAL_CONF').logname)
+    else:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    globals()[name] = res
+    return res
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(__lazy_attrs.keys())
+                  + ['interactive_cui', 'logger'])
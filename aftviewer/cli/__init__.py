@@ -2,24 +2,28 @@
 
 import os
 import sys
-import argparse
 from pathlib import Path
-from types import FunctionType
+from types import FunctionType, ModuleType
+from typing import Tuple, Optional
 from logging import getLogger
-import subprocess
 
-from ..core import (GLOBAL_CONF,
-                    get_filetype, load_lib, args_chk, print_key, print_error
+from ..core import (get_filetype, load_lib, args_chk, print_key,
+                    print_error
                     )
 from ..core.__version__ import VERSION
-from ..core.image_viewer import __collect_image_viewers
-from ..core.helpmsg import add_args_shell_cmp, add_args_update
 from ..core.types import Args
 
-logger = getLogger(GLOBAL_CONF.logname)
+# GLOBAL_CONF is imported in each function not to load the configuration
+# at import time (e.g. for the shell completion).
+sub_cmds = ['help', 'update', 'config_list', 'shell_completion']
 
 
-def get_args() -> Args:
+def get_args() -> Tuple[Args, Optional[ModuleType]]:
+    # argparse and helpmsg are not needed for the shell completion.
+    import argparse
+    from ..core import GLOBAL_CONF
+    from ..core.helpmsg import add_args_shell_cmp, add_args_update
+    logger = getLogger(GLOBAL_CONF.logname)
     supported_type = list(GLOBAL_CONF.types.keys()).copy()
     parser = argparse.ArgumentParser(
             prog='aftviewer',
@@ -48,17 +52,20 @@ def get_args() -> Args:
         add_args_shell_cmp(parser)
     elif tmpargs.file == 'update':
         add_args_update(parser)
-    if not args_chk(tmpargs, 'type'):
-        tmpargs.type = get_filetype(Path(tmpargs.file))
+    if not args_chk(tmpargs, 'type') and tmpargs.file not in sub_cmds:
+        # the file type is detected only once here.
+        tmpargs.type = get_filetype(Path(tmpargs.file).expanduser())
     lib = load_lib(tmpargs)
     if lib is not None:
         lib.add_args(parser)
     args = parser.parse_args()
+    args.type = tmpargs.type
     logger.debug(f'args: {args}')
-    return args
+    return args, lib
 
 
 def show_opts() -> None:
+    from ..core import GLOBAL_CONF
     for key, val in GLOBAL_CONF.opts.items():
         if type(val) is dict:
             print_key(key)
@@ -84,6 +91,9 @@ def set_shell_comp(args: Args) -> None:
 
 
 def update(branch: str) -> None:
+    import subprocess
+    from ..core import GLOBAL_CONF
+    logger = getLogger(GLOBAL_CONF.logname)
     py_cmd = None
     py_version = f'{sys.version_info.major}.{sys.version_info.minor}'
     for rel_path in [f'bin/python{py_version}',
@@ -112,7 +122,8 @@ def update(branch: str) -> None:
 
 
 def main() -> None:
-    args = get_args()
+    from ..core import GLOBAL_CONF
+    args, lib = get_args()
     if not (args.type is None or args.type in GLOBAL_CONF.types):
         supported_type = ', '.join(list(GLOBAL_CONF.types.keys()).copy())
         print(f'Please specify the type from {supported_type}.')
@@ -135,7 +146,6 @@ def main() -> None:
         if not args_chk(args, 'type'):
             print('please set --type to see the details.')
             return
-        lib = load_lib(args)
         if lib is None:
             print('Library file is not found.')
         else:
@@ -154,9 +164,6 @@ def main() -> None:
         print("{} is a directory.".format(fpath))
         return
 
-    if not args_chk(args, 'type'):
-        args.type = get_filetype(fpath)
-
     if args.type == 'text':
         if ('LANG' in os.environ) and ('ja_JP' in os.environ['LANG']):
             print('vimでも使ってろ！')
@@ -167,7 +174,6 @@ def main() -> None:
         print('This is not a supported file type.')
         return
 
-    lib = load_lib(args)
     if lib is None:
         print(f'The library file for "{args.type}" is not found.')
     else:
@@ -179,7 +185,9 @@ def get_types():
     if len(sys.argv) < 2:
         return ""
     elif sys.argv[1] == 'type':
+        from ..core import GLOBAL_CONF
         supported_type = list(GLOBAL_CONF.types.keys()).copy()
         print(' '.join(supported_type))
     elif sys.argv[1] == 'image_viewer':
+        from ..core.image_viewer import __collect_image_viewers
         print(' '.join(__collect_image_viewers()))
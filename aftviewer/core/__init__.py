@@ -1,70 +1,40 @@
 import os
 import sys
-import shutil
 import json
-import platform
-import subprocess
-import tarfile
-import mimetypes
-import pprint
+import threading
+from collections import OrderedDict, defaultdict
+from itertools import islice
 from importlib import import_module
 from pathlib import Path, PurePath
-from typing import Tuple, Any, Optional
+from typing import Tuple, Any, Optional, BinaryIO, TYPE_CHECKING
 from types import ModuleType
 from logging import getLogger, StreamHandler, FileHandler, NullHandler, \
     Formatter, DEBUG as logDEBUG, INFO as logINFO
 
-from pymeflib.color import FG, BG, FG256, BG256, END
-from pymeflib.tree2 import TreeViewer, GC, PPath
-from .types import CONF, Args, SF, COLType
+from .types import CONF, Args, SF, COLType, ReturnMessage
+if TYPE_CHECKING:
+    from pymeflib.tree2 import GC, PPath
 
+# NOTE: heavy modules (pymeflib, tarfile, pprint, subprocess, ...) are
+# imported in the functions that use them, and the configuration files are
+# read at the first access to GLOBAL_CONF or get_config(), to keep
+# the start-up time of the command line tools short.
 
-__debug = False
 if 'XDG_CONFIG_HOME' in os.environ:
     __conf_dir = Path(os.environ['XDG_CONFIG_HOME'])/'aftviewer'
 else:
     __conf_dir = Path(os.path.expanduser('~/.config'))/'aftviewer'
-if not __conf_dir.exists():
-    os.makedirs(__conf_dir, mode=0o755)
-
-# load config file.
-with (Path(__file__).parent/'default.json').open('r') as f:
-    __json_opts = json.load(f)
-if (__conf_dir/'setting.json').is_file():
-    with open(__conf_dir/'setting.json') as f:
-        load_opts = json.load(f)
-        if 'debug' in load_opts:
-            __debug = bool(load_opts['debug'])
-        if 'force_default' in load_opts and load_opts['force_default']:
-            load_opts = {}
-        if 'additional_types' in load_opts:
-            __add_types = load_opts['additional_types']
-            __json_opts['additional_types'] = __add_types
-        else:
-            __add_types = {}
-        for key in list(__json_opts.keys()) + list(__add_types.keys()):
-            if key == 'additional_types':
-                continue
-            if key in load_opts:
-                if key in __json_opts:
-                    # update values in default.json
-                    for k2, v2 in load_opts[key].items():
-                        if k2 in __json_opts[key]:
-                            __json_opts[key][k2] = v2
-                else:
-                    # create settings for new file type
-                    __json_opts[key] = load_opts[key]
-    del load_opts
-else:
-    __add_types = {}
+__conf_lock = threading.Lock()
+# valid main keys of get_config, set when the configuration is loaded.
+__config_keys: set = set()
 
 # set supported file types
-__type_config = {
+__default_types = {
     "hdf5": "hdf5",
     "pickle": "pkl pickle",
     "numpy": "npy npz",
     "np_pickle": "",
-    "tar": "",  # tar is identified by tarfile module.
+    "tar": "",  # tar is identified by the header.
     "zip": "zip",
     "sqlite3": "db db3 sqp sqp3 sqlite sqlite3",
     "raw_image": "raw nef nrw cr3 cr2 crw tif arw",  # nikon, canon, sony
@@ -73,7 +43,6 @@ __type_config = {
     "stl": "stl",
     "fits": "fits fit",
 }
-__type_config.update(__add_types)
 
 # logger setting
 __logname = 'AFTViewerLog'
@@ -84,15 +53,17 @@ __logger = getLogger(__logname)
 # in debug mode, more than INFO is shown in stdout and
 # all logs (more than DEBUG to be exact) are saved in conf_dir/debug.log.
 __logger.setLevel(logDEBUG)
+__logger.addHandler(NullHandler())
 
 
-def __set_logger():
-    global __logger, __debug, __log_file
-    if __debug:
+def __set_logger(debug: bool):
+    global __logger, __log_file
+    if debug:
         st_hdlr = StreamHandler()
         st_hdlr.setLevel(logINFO)
         st_format = '>> %(levelname)-9s %(message)s'
         st_hdlr.setFormatter(Formatter(st_format))
+        os.makedirs(__log_file.parent, mode=0o755, exist_ok=True)
         fy_hdlr = FileHandler(filename=__log_file, mode='w', encoding='utf-8')
         fy_hdlr.setLevel(logDEBUG)
         fy_format = '%(levelname)-9s %(asctime)s ' + \
@@ -101,20 +72,77 @@ def __set_logger():
         fy_hdlr.setFormatter(Formatter(fy_format))
         __logger.addHandler(st_hdlr)
         __logger.addHandler(fy_hdlr)
-    else:
-        null_hdlr = NullHandler()
-        __logger.addHandler(null_hdlr)
 
 
-__set_logger()
-__logger.debug(f'src: {__file__}')
-
-# global variables
-GLOBAL_CONF = CONF(__debug,
-                   __conf_dir,
-                   __json_opts,
-                   __type_config,
-                   __logname)
+def __merge_config(setting_file: Path) -> Tuple[bool, dict, dict]:
+    # merge default.json and setting.json.
+    debug = False
+    with (Path(__file__).parent/'default.json').open('r') as f:
+        json_opts = json.load(f)
+    if setting_file.is_file():
+        with open(setting_file) as f:
+            load_opts = json.load(f)
+        if 'debug' in load_opts:
+            debug = bool(load_opts['debug'])
+        if 'force_default' in load_opts and load_opts['force_default']:
+            load_opts = {}
+        if 'additional_types' in load_opts:
+            add_types = load_opts['additional_types']
+            json_opts['additional_types'] = add_types
+        else:
+            add_types = {}
+        for key in list(json_opts.keys()) + list(add_types.keys()):
+            if key == 'additional_types':
+                continue
+            if key in load_opts:
+                if key in json_opts:
+                    # update values in default.json
+                    for k2, v2 in load_opts[key].items():
+                        if k2 in json_opts[key]:
+                            json_opts[key][k2] = v2
+                else:
+                    # create settings for new file type
+                    json_opts[key] = load_opts[key]
+    else:
+        add_types = {}
+    return debug, json_opts, add_types
+
+
+def __load_config() -> None:
+    # load config files and set the global variables.
+    # This is called once at the first access to the configuration.
+    global GLOBAL_CONF, __json_opts, __type_config, __add_types, \
+        __config_keys
+    if 'GLOBAL_CONF' in globals():
+        return
+    with __conf_lock:
+        if 'GLOBAL_CONF' in globals():
+            return
+        debug, json_opts, add_types = \
+            __merge_config(__conf_dir/'setting.json')
+        type_config = dict(__default_types)
+        type_config.update(add_types)
+
+        __set_logger(debug)
+        __logger.debug(f'src: {__file__}')
+        __json_opts = json_opts
+        __type_config = type_config
+        __add_types = add_types
+        __config_keys = {'config', 'colors'} | set(type_config.keys())
+        # global variables
+        GLOBAL_CONF = CONF(debug,
+                           __conf_dir,
+                           __json_opts,
+                           __type_config,
+                           __logname)
+
+
+def __getattr__(name: str) -> Any:
+    # the configuration is loaded when it is accessed at first.
+    if name in ['GLOBAL_CONF', '__json_opts', '__type_config']:
+        __load_config()
+        return globals()[name]
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 def args_chk(args: Args, attr: str) -> bool:
@@ -176,8 +204,10 @@ def get_config(key1: str, key2: str) -> Any:
     Any
         Return specified configuration value. If it is not set, return None.
     """
-    assert key1 in ["config", "colors"] + list(__type_config.keys()), \
-        f'incorrect key name: {key1}'
+    if key1 not in __config_keys:
+        # this is also the first call before loading the configuration.
+        __load_config()
+        assert key1 in __config_keys, f'incorrect key name: {key1}'
     if key1 not in __json_opts:
         # type name is not set in setting.json.
         return None
@@ -215,6 +245,7 @@ def cprint(str1: str, str2: str = '',
     -------
     None
     """
+    from pymeflib.color import FG, BG, FG256, BG256, END
     if type(fg) is str and fg in FG:
         fg_str = FG[fg]
     elif type(fg) is int and 0 <= fg <= 255:
@@ -267,8 +298,93 @@ def get_col(name: str) -> Tuple[COLType,
         return col_conf
 
 
-def interactive_view(fname: str, get_contents: GC, show_func: SF,
-                     purepath: PPath = PurePath) -> None:
+def cache_show_func(show_func: SF) -> SF:
+    """
+    wrap show_func to cache the returned messages.
+    The cache is keyed on the path and the keyword arguments,
+    and bounded by "result_cache_mb" configuration option with LRU eviction.
+    Calls with system=True, unhashable arguments, image files (their
+    results are shown by the image viewers as side effects), error messages,
+    and non-str messages (sequences or iterators) are not cached.
+    The wrapped function has following attributes.
+    cache_get(path, **kwargs): return the cached ReturnMessage or None.
+    cache_info(): return hits, misses, the number of cached items,
+    and the total size (bytes) of the cached messages.
+
+    Parameters
+    ----------
+    show_func: Callable[[str, **kwargs], ReturnMessage]
+        A function to show the contents. See interactive_view.
+
+    Returns
+    -------
+    Callable[[str, **kwargs], ReturnMessage]
+        wrapped function.
+    """
+    from .image_viewer import is_image
+    cache_mb = get_config('config', 'result_cache_mb')
+    max_bytes = 0 if cache_mb is None else cache_mb*1024**2
+    cache: OrderedDict = OrderedDict()
+    lock = threading.Lock()
+    stats = {'hits': 0, 'misses': 0, 'nbytes': 0}
+
+    def get_key(path: str, kwargs: dict) -> Optional[tuple]:
+        if kwargs.get('system', False) or max_bytes <= 0:
+            return None
+        if is_image(path):
+            return None
+        key = (str(path), tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def cache_get(path: str, **kwargs) -> Optional[ReturnMessage]:
+        key = get_key(path, kwargs)
+        with lock:
+            if key is None or key not in cache:
+                return None
+            cache.move_to_end(key)
+            return cache[key][0]
+
+    def cache_info() -> Tuple[int, int, int, int]:
+        with lock:
+            return (stats['hits'], stats['misses'], len(cache),
+                    stats['nbytes'])
+
+    def wrapper(path: str, **kwargs) -> ReturnMessage:
+        key = get_key(path, kwargs)
+        if key is None:
+            return show_func(path, **kwargs)
+        with lock:
+            if key in cache:
+                stats['hits'] += 1
+                cache.move_to_end(key)
+                return cache[key][0]
+            stats['misses'] += 1
+        res = show_func(path, **kwargs)
+        if res.error or not isinstance(res.message, str):
+            return res
+        size = sys.getsizeof(res.message)
+        if size > max_bytes:
+            return res
+        with lock:
+            if key not in cache:
+                cache[key] = (res, size)
+                stats['nbytes'] += size
+            while stats['nbytes'] > max_bytes:
+                _, (_, old_size) = cache.popitem(last=False)
+                stats['nbytes'] -= old_size
+        return res
+
+    wrapper.cache_get = cache_get
+    wrapper.cache_info = cache_info
+    return wrapper
+
+
+def interactive_view(fname: str, get_contents: 'GC', show_func: SF,
+                     purepath: 'PPath' = PurePath) -> None:
     """
     provide the interactive UI to show the contents.
 
@@ -290,7 +406,8 @@ def interactive_view(fname: str, get_contents: GC, show_func: SF,
         Please see the wiki for possible keywords.
         The return value is the ReturnMessage. It is treated as
         an error message if ReturnMessage.error is True. Otherwise, it is
-        treated as a standard message.
+        treated as a standard message. The message can be an iterator
+        of lines, which are printed as soon as they are read.
     purepath: PurePath, PurePosixPath, or PureWindowsPath
         Specify the class to treat the path-like object.
         This is because in some case, the separator shoud be '/' not '\\'
@@ -300,12 +417,16 @@ def interactive_view(fname: str, get_contents: GC, show_func: SF,
     -------
     None
     """
+    import shutil
+    import pprint
+    from pymeflib.tree2 import TreeViewer
     cpath = purepath('.')
     inter_str = "'q':quit, '..':go to parent, key_name:select a key >> "
     fg1, bg1 = get_col('interactive_path')
     fg2, bg2 = get_col('interactive_contents')
     fg3, bg3 = get_col('interactive_output')
     tv = TreeViewer('.', get_contents, purepath=purepath, logger=__logger)
+    show_func = cache_show_func(show_func)
     while True:
         term_size = shutil.get_terminal_size()
         print('='*(term_size.columns-5))
@@ -337,7 +458,11 @@ def interactive_view(fname: str, get_contents: GC, show_func: SF,
             if key_name in files:
                 cprint('output::', '\n', fg=fg3, bg=bg3)
                 info = show_func(str(cpath/key_name), cui=False)
-                if not info.error:
+                if not info.error and not isinstance(info.message, str):
+                    # lines are printed as soon as they are read.
+                    for line in info.message:
+                        print(line)
+                elif not info.error:
                     print(info.message)
                 else:
                     print_error(info.message)
@@ -412,6 +537,8 @@ def run_system_cmd(fname: str) -> bool:
     bool
         Return True if the command succeeded, otherwise False.
     """
+    import platform
+    import subprocess
     cmd = get_config('config', 'system_cmd')
     if cmd is None:
         if platform.system() == 'Windows':
@@ -461,23 +588,272 @@ def set_numpy_format(numpy: Any) -> None:
     numpy.set_printoptions(**opts)
 
 
+class __Marker():
+    # placeholder of truncated items, which is shown as it is
+    # and sorted at the end by pprint.
+    def __init__(self, text: str):
+        self.text = text
+
+    def __repr__(self) -> str:
+        return self.text
+
+    def __lt__(self, other: Any) -> bool:
+        return False
+
+    def __gt__(self, other: Any) -> bool:
+        return True
+
+
+# truncated containers and the markers of the omitted items.
+__containers = {dict: '{...}', list: '[...]', tuple: '(...)',
+                set: '{...}', frozenset: '{...}'}
+
+
+def __rebuild(obj: Any, items: Any, base: type) -> Any:
+    # make a container of the same type as obj from the truncated items.
+    # subclasses are kept (OrderedDict, defaultdict, namedtuple, ...),
+    # and the base type is used if the subclass can't be made.
+    if type(obj) is base:
+        return base(items) if base is not dict else items
+    try:
+        if isinstance(obj, defaultdict):
+            return type(obj)(obj.default_factory, items)
+        elif isinstance(obj, tuple) and hasattr(obj, '_make'):
+            # namedtuple
+            return obj._make(items)
+        else:
+            return type(obj)(items)
+    except (TypeError, ValueError):
+        return base(items)
+
+
+def __truncate(obj: Any, depth: int, ids: set, limits: dict) -> Any:
+    # make a truncated copy of the containers.
+    max_items = limits.get('max_items')
+    max_depth = limits.get('max_depth')
+    max_bytes = limits.get('max_bytes')
+    if isinstance(obj, (str, bytes)):
+        if max_bytes is not None and len(obj) > max_bytes:
+            return __Marker(f'{obj[:max_bytes]!r}'
+                            f'...({len(obj)-max_bytes} more)')
+        return obj
+    for base in __containers:
+        if isinstance(obj, base):
+            break
+    else:
+        return obj
+    if id(obj) in ids:
+        return __Marker(f'<Recursion on {type(obj).__name__}'
+                        f' with id={id(obj)}>')
+    if max_depth is not None and depth >= max_depth:
+        return __Marker(__containers[base])
+    ids.add(id(obj))
+    num = len(obj)
+    if max_items is not None and num > max_items:
+        marker = __Marker(f'...({num-max_items} more)')
+    else:
+        marker = None
+    if base is dict:
+        res = {k: __truncate(v, depth+1, ids, limits)
+               for k, v in islice(obj.items(), max_items)}
+        if marker is not None:
+            # shown as "...(N more): ..." in the dict.
+            res[marker] = __Marker('...')
+    else:
+        res = [__truncate(v, depth+1, ids, limits)
+               for v in islice(obj, max_items)]
+        if marker is not None:
+            res.append(marker)
+    res = __rebuild(obj, res, base)
+    ids.remove(id(obj))
+    return res
+
+
+def limited_pformat(obj: Any, **kwargs) -> str:
+    """
+    pretty-format the object with limited size.
+    Containers (dict, list, tuple, set, frozenset, and their subclasses)
+    are truncated before formatting following the "pp_limits"
+    configuration option, so the cost is proportional to the shown items,
+    not to the object size.
+
+    Parameters
+    ----------
+    obj: Any
+        the object to be formatted.
+    kwargs:
+        keyword arguments passed to pprint.pformat.
+
+    Returns
+    -------
+    str
+        formatted string. Truncated items are shown as "...(N more)",
+        or "...(N more): ..." in dicts.
+    """
+    import pprint
+    limits = get_config('config', 'pp_limits')
+    if limits is None:
+        limits = {}
+    res = pprint.pformat(__truncate(obj, 0, set(), limits), **kwargs)
+    max_bytes = limits.get('max_bytes')
+    if max_bytes is not None and len(res) > max_bytes:
+        res = f'{res[:max_bytes]}\n...({len(res)-max_bytes} more)'
+    return res
+
+
+# file signatures; (file type, offsets, magic bytes)
+__magic_numbers = [
+    ('hdf5', [0, 512, 1024, 2048], b'\x89HDF\r\n\x1a\n'),
+    ('numpy', [0], b'\x93NUMPY'),
+    ('sqlite3', [0], b'SQLite format 3\x00'),
+    ('fits', [0], b'SIMPLE  ='),
+    ('xpm', [0], b'/* XPM */'),
+    ('raw_image', [0], b'II*\x00'),  # TIFF based raw images.
+    ('raw_image', [0], b'MM\x00*'),
+    ('raw_image', [4], b'ftypcrx '),  # canon cr3
+]
+# the size of the header read to detect the file type.
+__header_size = 4096
+
+
+def __is_tarfile(fp: BinaryIO) -> bool:
+    import tarfile
+    fp.seek(0)
+    try:
+        with tarfile.open(fileobj=fp):
+            return True
+    except tarfile.TarError:
+        return False
+
+
+def __is_tar_header(head: bytes) -> bool:
+    if len(head) < 512:
+        return False
+    if head[257:262] == b'ustar':
+        return True
+    # old (v7) format; check the checksum of the header block.
+    try:
+        chksum = int(head[148:156].split(b'\0', 1)[0].strip(), 8)
+    except ValueError:
+        return False
+    return chksum == sum(head[:148]) + 8*0x20 + sum(head[156:512])
+
+
+def __decompress_header(head: bytes) -> Optional[bytes]:
+    # return the first 512 bytes of the decompressed data,
+    # or None if it is not available from the header.
+    import zlib
+    if head[:2] == b'\x1f\x8b':
+        dobj = zlib.decompressobj(16+zlib.MAX_WBITS)
+        try:
+            return dobj.decompress(head, 512)
+        except zlib.error:
+            return b''
+    elif head[:6] == b'\xfd7zXZ\x00':
+        try:
+            import lzma
+        except ImportError:
+            return None
+        try:
+            return lzma.LZMADecompressor().decompress(head, 512)
+        except lzma.LZMAError:
+            return b''
+    # bz2 needs a whole block (up to 900 kB) to get the data.
+    return None
+
+
+def __sniff_filetype(fp: BinaryIO, head: bytes) -> Optional[str]:
+    # detect the file type from the magic numbers in the header.
+    for typ, offsets, magic in __magic_numbers:
+        for offset in offsets:
+            if head[offset:offset+len(magic)] == magic:
+                return typ
+    if head[:4] in [b'PK\x03\x04', b'PK\x05\x06']:
+        # npz is a zip file of npy files. This is used only for the files
+        # without known extensions (e.g. "*.zip" is always a zip file).
+        name_len = int.from_bytes(head[26:28], 'little')
+        if head[30:30+name_len].endswith(b'.npy'):
+            return 'numpy'
+        return 'zip'
+    if len(head) > 1 and head[0] == 0x80 and 2 <= head[1] <= 5:
+        # pickle protocol >= 2, which ends with STOP.
+        fp.seek(-1, os.SEEK_END)
+        if fp.read(1) == b'.':
+            return 'pickle'
+    if __is_tar_header(head):
+        return 'tar'
+    if head[:3] == b'BZh':
+        if __is_tarfile(fp):
+            return 'tar'
+    else:
+        dec_head = __decompress_header(head)
+        if dec_head is not None:
+            if len(dec_head) < 512 and len(head) == __header_size:
+                # the header is not enough to get the first block.
+                if __is_tarfile(fp):
+                    return 'tar'
+            elif __is_tar_header(dec_head):
+                return 'tar'
+    if head[:5] == b'solid' and b'facet' in head:
+        # ascii STL
+        return 'stl'
+    if len(head) >= 84:
+        # binary STL; 80 bytes header, number of triangles (uint32),
+        # and 50 bytes per triangle.
+        num = int.from_bytes(head[80:84], 'little')
+        if num > 0 and fp.seek(0, os.SEEK_END) == 84+50*num:
+            return 'stl'
+    return None
+
+
+def __detect_filetype(fpath: Path) -> Optional[str]:
+    # all checks reading the file share one file handle and header.
+    # the result depends only on the contents, not on the configuration.
+    with fpath.open('rb') as fp:
+        head = fp.read(__header_size)
+        return __sniff_filetype(fp, head)
+
+
+def __detect_filetype_cache(fpath: Path) -> Optional[str]:
+    if not get_config('config', 'disk_cache_mb'):
+        return __detect_filetype(fpath)
+    from .cache import load_cache, save_cache
+    typ = load_cache(fpath, 'magic')
+    if typ is not None:
+        __logger.debug(f'magic number type: {typ} (cache)')
+        return typ
+    typ = __detect_filetype(fpath)
+    if typ is not None:
+        save_cache(fpath, 'magic', typ)
+    return typ
+
+
 def get_filetype(fpath: Path) -> Optional[str]:
+    import mimetypes
+    __load_config()
     if not fpath.is_file():
         __logger.debug('file does not exists')
         return None
     ext = fpath.suffix[1:].lower()
-    if tarfile.is_tarfile(fpath):
+    magic_type = __detect_filetype_cache(fpath)
+    # same as before, tar files have the priority, and the extensions
+    # (built-in types, then additional types) are checked next.
+    # The other magic numbers are used for the files without known
+    # extensions.
+    if magic_type == 'tar':
         __logger.debug('set file type: tar')
         return 'tar'
-    else:
-        for typ, exts in __type_config.items():
-            if ext in exts.split():
-                __logger.debug(f'set file type: {typ}')
-                return typ
-        mt = mimetypes.guess_type(fpath)[0]
-        __logger.info(f'get mimetype: {mt}')
-        if mt is not None and mt.split('/')[0] == 'text':
-            return 'text'
+    for typ, exts in __type_config.items():
+        if ext in exts.split():
+            __logger.debug(f'set file type: {typ}')
+            return typ
+    if magic_type is not None:
+        __logger.debug(f'set file type: {magic_type} (magic number)')
+        return magic_type
+    mt = mimetypes.guess_type(fpath)[0]
+    __logger.info(f'get mimetype: {mt}')
+    if mt is not None and mt.split('/')[0] == 'text':
+        return 'text'
     __logger.debug('file type is not set.')
     return None
 
@@ -490,6 +866,7 @@ def load_lib(args: Args) -> Optional[ModuleType]:
         __logger.debug('file type is text.')
         return None
 
+    __load_config()
     # lib_path  -> python import style
     # lib_path2 -> file path
     if args.type in __add_types:
@@ -0,0 +1,166 @@
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path, PurePath
+from typing import Any, Optional, Callable, Tuple, List, Union
+from logging import getLogger
+
+from . import GLOBAL_CONF, get_config
+
+logger = getLogger(GLOBAL_CONF.logname)
+# cache files are saved in conf_dir/cache as <hash>.json.
+# the hash is made from the file identity (path, size, mtime, inode)
+# and the name of the cache, so that the cache of a modified file
+# is not used anymore. Old files are removed from the least recently used.
+
+
+def get_cache_path(fpath: Path, name: str) -> Optional[Path]:
+    # return None if the disk cache is disabled.
+    cache_mb = get_config('config', 'disk_cache_mb')
+    if cache_mb is None or cache_mb <= 0:
+        return None
+    try:
+        stat = fpath.stat()
+        ident = f'{fpath.resolve()}\0{stat.st_size}\0' \
+            f'{stat.st_mtime_ns}\0{stat.st_ino}\0{name}'
+    except OSError as e:
+        logger.warning(f'failed to get the file identity: {e}')
+        return None
+    digest = hashlib.sha1(ident.encode('utf-8', 'surrogateescape'))
+    return GLOBAL_CONF.conf_dir/'cache'/f'{digest.hexdigest()}.json'
+
+
+def load_cache(fpath: Path, name: str) -> Any:
+    # return None if the cache is not found.
+    cache_path = get_cache_path(fpath, name)
+    if cache_path is None or not cache_path.is_file():
+        return None
+    try:
+        with cache_path.open('r', encoding='utf-8') as f:
+            data = json.load(f)
+        # update the modification time for LRU eviction.
+        os.utime(cache_path)
+    except (OSError, ValueError) as e:
+        logger.warning(f'failed to load the cache {cache_path}: {e}')
+        return None
+    logger.debug(f'load cache: {name} of {fpath} from {cache_path}')
+    return data
+
+
+def save_cache(fpath: Path, name: str, data: Any) -> None:
+    cache_path = get_cache_path(fpath, name)
+    if cache_path is None:
+        return
+    tmp_path = cache_path.with_suffix(f'.{os.getpid()}.tmp')
+    try:
+        cache_path.parent.mkdir(mode=0o755, parents=True, exist_ok=True)
+        with tmp_path.open('w', encoding='utf-8') as f:
+            json.dump(data, f)
+        # replace at once not to read a broken file in other processes.
+        os.replace(tmp_path, cache_path)
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning(f'failed to save the cache {cache_path}: {e}')
+        if tmp_path.exists():
+            tmp_path.unlink()
+        return
+    logger.debug(f'save cache: {name} of {fpath} to {cache_path}')
+    evict_cache(cache_path.parent,
+                get_config('config', 'disk_cache_mb')*1024*1024)
+
+
+def evict_cache(cache_dir: Path, max_bytes: int) -> None:
+    # remove the least recently used files until the total size is
+    # less than max_bytes.
+    files = []
+    total = 0
+    for cache_path in cache_dir.glob('*.json'):
+        try:
+            stat = cache_path.stat()
+        except OSError:
+            continue
+        files.append((stat.st_mtime_ns, stat.st_size, cache_path))
+        total += stat.st_size
+    files.sort()
+    for mtime, size, cache_path in files:
+        if total <= max_bytes:
+            break
+        try:
+            cache_path.unlink()
+        except OSError as e:
+            logger.warning(f'failed to remove the cache {cache_path}: {e}')
+            continue
+        logger.debug(f'remove cache: {cache_path}')
+        total -= size
+
+
+class ContentsCache:
+    """
+    wrapper of the get_contents function to cache the returned lists
+    on the disk. The cache is saved in conf_dir/cache and is identified
+    by the path, size, modification time, and inode of the file, so
+    the cache of a modified file is not used. The total size is bounded
+    by "disk_cache_mb" configuration option with LRU eviction.
+    If "disk_cache_mb" is 0, the results are not cached.
+
+    Parameters
+    ----------
+    fpath: Path
+        An opened file.
+    name: str
+        A name of the cache, e.g., the file type.
+    get_contents: Callable[[PurePath], Tuple[List[str], List[str]]]
+        A function to get lists of directories and files.
+        This is called only if the path is not cached.
+
+    Methods
+    -------
+    __call__(path)
+        Return lists of directories and files in the same way as
+        get_contents.
+    save()
+        Save the cache to the disk if it is updated.
+        This can be called while the other threads (e.g. the file index
+        of the CUI) are adding the contents.
+    """
+    def __init__(self, fpath: Path, name: str,
+                 get_contents: Callable[[Union[str, PurePath]],
+                                        Tuple[List[str], List[str]]]):
+        self.fpath = Path(fpath)
+        self.name = f'contents-{name}'
+        self.get_contents = get_contents
+        self.enabled = get_cache_path(self.fpath, self.name) is not None
+        self.updated = False
+        self.lock = threading.Lock()
+        data = None
+        if self.enabled:
+            data = load_cache(self.fpath, self.name)
+        if isinstance(data, dict):
+            self.contents = data
+        else:
+            self.contents = {}
+
+    def __call__(self, path: Union[str, PurePath]
+                 ) -> Tuple[List[str], List[str]]:
+        if not self.enabled:
+            return self.get_contents(path)
+        key = str(path)
+        with self.lock:
+            cached = self.contents.get(key)
+        if cached is not None:
+            dirs, files = cached
+        else:
+            dirs, files = self.get_contents(path)
+            with self.lock:
+                self.contents[key] = [list(dirs), list(files)]
+                self.updated = True
+        return list(dirs), list(files)
+
+    def save(self) -> None:
+        # the contents are copied not to be changed during json.dump.
+        with self.lock:
+            if not (self.enabled and self.updated):
+                return
+            contents = dict(self.contents)
+            self.updated = False
+        save_cache(self.fpath, self.name, contents)
@@ -1,13 +1,17 @@
 import re
+import heapq
+from bisect import bisect_left, bisect_right
 import curses
+import threading
 from curses.textpad import Textbox, rectangle
 from pathlib import PurePath
-from typing import List, Dict, Tuple, Optional, Callable
+from typing import List, Dict, Tuple, Optional, Callable, Sequence, Any
 from logging import getLogger, StreamHandler
 
 from pymeflib.tree2 import TreeViewer, GC, PPath
-from . import GLOBAL_CONF, get_config, print_error
+from . import GLOBAL_CONF, get_config, print_error, cache_show_func
 from .types import ReturnMessage, SF
+from .image_viewer import is_image
 logger = getLogger(GLOBAL_CONF.logname)
 
 default_color_set = {
@@ -34,11 +38,365 @@ class CUIWin():
     def update(self):
         if self.updatefunc is None:
             return
-        self.b.clear()
+        # erase() (not clear()) lets curses redraw only the changed rows.
+        self.b.erase()
         self.updatefunc()
         self.b.refresh()
 
 
+class SidebarItems():
+    """
+    items shown in the sidebar; directories followed by files.
+    The lists of directories and files are referred (not copied),
+    and the kind of an item is given by its index, so both of the
+    item access and the kind check are O(1).
+    """
+    def __init__(self, dirs: List[str], files: List[str]):
+        self.dirs = dirs
+        self.files = files
+
+    def __len__(self) -> int:
+        return len(self.dirs)+len(self.files)
+
+    def __getitem__(self, idx: int) -> str:
+        if idx < 0:
+            idx += len(self)
+        if idx < len(self.dirs):
+            return self.dirs[idx]
+        return self.files[idx-len(self.dirs)]
+
+    def is_dir(self, idx: int) -> bool:
+        return idx < len(self.dirs)
+
+
+class LazyLines():
+    """
+    lines of ReturnMessage.message, which are read on demand.
+    The message is a str, a sequence of lines, or an iterator of lines.
+    len() returns the number of lines read so far.
+    """
+    def __init__(self, message: Any):
+        self.seq: Optional[Sequence[str]] = None
+        self.iter = None
+        self.buf: List[str] = []
+        if isinstance(message, str):
+            self.buf = message.replace("\t", "  ").split("\n")
+        elif isinstance(message, Sequence):
+            self.seq = message
+        else:
+            self.iter = iter(message)
+
+    def __len__(self) -> int:
+        if self.seq is not None:
+            return len(self.seq)
+        return len(self.buf)
+
+    def __getitem__(self, idx: int) -> str:
+        if self.seq is not None:
+            return self.seq[idx].replace("\t", "  ")
+        return self.buf[idx]
+
+    @property
+    def complete(self) -> bool:
+        return self.iter is None
+
+    def fill(self, num: Optional[int] = None) -> None:
+        # read lines until the number of lines reaches num (all if None).
+        while self.iter is not None and (num is None or len(self.buf) < num):
+            try:
+                line = next(self.iter)
+            except StopIteration:
+                self.iter = None
+            except Exception as e:
+                logger.error(f'failed to read lines: {e}')
+                self.buf.append(f'!! {type(e).__name__}: {e}')
+                self.iter = None
+            else:
+                self.buf += line.rstrip("\n").replace("\t", "  ").split("\n")
+
+
+class LineStore():
+    """
+    lines shown in the main window.
+    The width of the line number is computed once per message, and
+    only the rows in the window are sliced when the lines are wrapped.
+    """
+    def __init__(self, lines: Sequence[str]):
+        self.lines = lines
+        self.lnwidth = len(str(len(lines)))
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    @property
+    def complete(self) -> bool:
+        if isinstance(self.lines, LazyLines):
+            return self.lines.complete
+        return True
+
+    def fill(self, num: Optional[int] = None) -> None:
+        if isinstance(self.lines, LazyLines):
+            self.lines.fill(num)
+            self.lnwidth = len(str(len(self.lines)))
+
+    def rows(self, idx: int, width: int, wrap: bool,
+             max_rows: int) -> List[str]:
+        # rows of the idx-th line; at most max_rows rows are sliced.
+        line = self.lines[idx]
+        if not wrap or len(line) <= width:
+            return [line]
+        width = max(width, 1)
+        end = min(len(line), width*max_rows)
+        return [line[x:x+width] for x in range(0, end, width)]
+
+
+class WordIndex():
+    """
+    positions of the search word in the lines.
+    The pattern is compiled once and the lines are scanned lazily
+    by chunks; the found matches are kept in a sorted list of
+    (line, start col, end col), so the next and previous matches
+    are found by bisection.
+    """
+    chunk = 1000
+
+    def __init__(self, word: str, lines: LineStore):
+        self.word = word
+        try:
+            self.pattern = re.compile(word)
+        except re.error:
+            self.pattern = re.compile(re.escape(word))
+        self.lines = lines
+        self.matches: List[Tuple[int, int, int]] = []
+        # number of scanned lines
+        self.scanned = 0
+
+    @property
+    def complete(self) -> bool:
+        return self.lines.complete and self.scanned >= len(self.lines)
+
+    def scan(self, num: int) -> None:
+        # scan the lines up to num.
+        self.lines.fill(num)
+        end = min(num, len(self.lines))
+        finditer = self.pattern.finditer
+        for i in range(self.scanned, end):
+            for m in finditer(self.lines.lines[i]):
+                if m.end() > m.start():
+                    self.matches.append((i, m.start(), m.end()))
+        self.scanned = max(self.scanned, end)
+
+    def next(self, line: int, col: int) -> Optional[int]:
+        # index of the first match after (line, col).
+        while True:
+            idx = bisect_right(self.matches, (line, col, float('inf')))
+            if idx < len(self.matches) or self.complete:
+                break
+            self.scan(self.scanned+self.chunk)
+        if idx < len(self.matches):
+            return idx
+        return None
+
+    def previous(self, line: int, col: int) -> Optional[int]:
+        # index of the last match before (line, col).
+        if self.scanned <= line:
+            self.scan(line+1)
+        idx = bisect_left(self.matches, (line, col, -1))-1
+        if idx >= 0:
+            return idx
+        return None
+
+    def count(self) -> str:
+        return f'{len(self.matches)}{"" if self.complete else "+"}'
+
+
+class Prefetcher():
+    """
+    render the items near the cursor in a background thread.
+    show_func should be wrapped by cache_show_func; the results are
+    kept in its cache. A new request replaces the pending paths,
+    and the generation counter cancels the item waiting for the lock.
+    """
+    def __init__(self, show_func: SF, lock: threading.Lock, **kwargs):
+        self.show_func = show_func
+        self.lock = lock
+        self.kwargs = kwargs
+        self.queue: List[str] = []
+        self.generation = 0
+        self.stopped = False
+        self.cond = threading.Condition()
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def stop(self) -> None:
+        # should be called with the lock held;
+        # the file is not read after this.
+        with self.cond:
+            self.stopped = True
+            self.queue = []
+
+    def request(self, paths: List[str]) -> None:
+        with self.cond:
+            self.generation += 1
+            self.queue = [p for p in paths if self.get(p) is None]
+            self.cond.notify()
+
+    def get(self, path: str) -> Optional[ReturnMessage]:
+        return self.show_func.cache_get(path, **self.kwargs)
+
+    def run(self) -> None:
+        while True:
+            with self.cond:
+                while len(self.queue) == 0:
+                    self.cond.wait()
+                path = self.queue.pop(0)
+                generation = self.generation
+            with self.lock:
+                with self.cond:
+                    if self.stopped:
+                        return
+                    if generation != self.generation:
+                        # the cursor moved.
+                        continue
+                try:
+                    self.show_func(path, **self.kwargs)
+                except Exception as e:
+                    logger.warning(f'failed to prefetch {path}: {e}')
+
+
+class FileIndex():
+    """
+    flattened lists of all directories and files.
+    The lists are built once in a background thread.
+    get_contents is called with the given lock held, since the main thread
+    may read the file at the same time.
+    """
+    def __init__(self, get_contents: GC, purepath: PPath,
+                 lock: threading.Lock):
+        self.get_contents = get_contents
+        self.purepath = purepath
+        self.lock = lock
+        self.dirs: List[str] = []
+        self.files: List[str] = []
+        self.done = threading.Event()
+        self.failed = False
+        self.stopped = False
+
+    def start(self) -> None:
+        threading.Thread(target=self.build, daemon=True).start()
+
+    def stop(self) -> None:
+        # should be called with the lock held;
+        # the file is not read after this.
+        self.stopped = True
+
+    def locked_get_contents(self, path: PurePath):
+        with self.lock:
+            if self.stopped:
+                # the file may be closed.
+                return [], []
+            return self.get_contents(path)
+
+    def build(self) -> None:
+        try:
+            tv = TreeViewer('.', self.locked_get_contents,
+                            purepath=self.purepath, logger=logger)
+            for cpath, dirs, files in tv:
+                self.dirs += [str(cpath/d) for d in dirs]
+                self.files += [str(cpath/f) for f in files]
+        except Exception as e:
+            # e.g., the file can be read only in the main thread.
+            logger.warning(f'failed to build the file index: {e}')
+            self.failed = True
+        finally:
+            self.done.set()
+
+    def wait(self) -> None:
+        self.done.wait()
+        if self.failed:
+            logger.info('build the file index in the main thread')
+            self.dirs = []
+            self.files = []
+            self.failed = False
+            self.build()
+
+
+class FileMatcher():
+    """
+    match the file index with the query.
+    The query is treated as a regular expression if it includes
+    meta characters, otherwise as a fuzzy (subsequence) pattern.
+    In the fuzzy mode, the results are narrowed incrementally while
+    the query is extended, and ranked by the length of the matched part.
+    """
+    meta = set('.^$*+?{}[]\\|()')
+
+    def __init__(self, index: FileIndex):
+        self.index = index
+        self.query: Optional[str] = None
+        self.fuzzy = False
+        self.size = (0, 0)
+        # (score, path) of the matched directories and files.
+        self.dirs: List[Tuple[Tuple[int, int], str]] = []
+        self.files: List[Tuple[Tuple[int, int], str]] = []
+
+    def compile(self, query: str) -> Tuple['re.Pattern', bool]:
+        if self.meta & set(query):
+            try:
+                return re.compile(query), False
+            except re.error:
+                pass
+        # smart case
+        flags = 0 if query.lower() != query else re.IGNORECASE
+        return re.compile('.*?'.join([re.escape(c) for c in query]),
+                          flags), True
+
+    @staticmethod
+    def filter(pattern: 're.Pattern', items):
+        res = []
+        search = pattern.search
+        for item in items:
+            # item is a path or (score, path) of the previous results.
+            path = item[1] if type(item) is tuple else item
+            m = search(path)
+            if m is not None:
+                res.append(((m.end()-m.start(), len(path)), path))
+        return res
+
+    def match(self, query: str) -> Tuple[int, int]:
+        # return the number of matched directories and files.
+        pattern, fuzzy = self.compile(query)
+        nd = len(self.index.dirs)
+        nf = len(self.index.files)
+        if fuzzy and self.fuzzy and self.query is not None and \
+           query.startswith(self.query):
+            # narrow down the previous results.
+            dirs = self.dirs+self.index.dirs[self.size[0]:nd]
+            files = self.files+self.index.files[self.size[1]:nf]
+        else:
+            dirs = self.index.dirs[:nd]
+            files = self.index.files[:nf]
+        self.dirs = self.filter(pattern, dirs)
+        self.files = self.filter(pattern, files)
+        self.query = query
+        self.fuzzy = fuzzy
+        self.size = (nd, nf)
+        return len(self.dirs), len(self.files)
+
+    def top(self, num: int) -> List[str]:
+        if self.fuzzy:
+            items = heapq.nsmallest(num, self.dirs+self.files)
+        else:
+            items = (self.dirs+self.files)[:num]
+        return [path for score, path in items]
+
+    def results(self) -> Tuple[List[str], List[str]]:
+        if self.fuzzy:
+            return ([path for score, path in sorted(self.dirs)],
+                    [path for score, path in sorted(self.files)])
+        return ([path for score, path in self.dirs],
+                [path for score, path in self.files])
+
+
 class CursesCUI():
     def __init__(self, purepath: PPath = PurePath):
         # selected item
@@ -46,7 +404,9 @@ class CursesCUI():
         # information about selected item
         self.info = ReturnMessage('', False)
         # message shown in the main window
-        self.message: List[str] = []
+        self.message: Sequence[str] = []
+        # cache of the message; rebuilt when self.message is replaced.
+        self.lines = LineStore(self.message)
         # flag if display the line number or not
         self.line_number: bool = get_config('config', 'cui_linenumber')
         # flag if wrap the message
@@ -57,6 +417,14 @@ class CursesCUI():
         self.key = ''
         # key maps
         self.keymaps: Dict[str, list] = {}
+        # lock to read the file from the main and background threads
+        self.lock = threading.Lock()
+        # directories and files in the sidebar
+        self.items = SidebarItems([], [])
+        # number of items prefetched in each side of the cursor
+        self.prefetch: int = get_config('config', 'cui_prefetch')
+        self.prefetcher: Optional[Prefetcher] = None
+        self.prefetch_state: Optional[tuple] = None
 
     def init_win(self):
         self.winy, self.winx = self.stdscr.getmaxyx()
@@ -95,7 +463,7 @@ class CursesCUI():
         self.sidebar.ud = 0
         self.sidebar.lr = 0
         self.sidebar.idx = 0
-        self.sidebar.contents: List[str] = []
+        self.sidebar.contents = self.items
         self.sidebar.scroll_h = 5
         self.sidebar.scroll_w = 3
         self.sidebar.down = self._down_sidebar
@@ -134,6 +502,8 @@ class CursesCUI():
         self.search.cmt = ''  # comments shown in the main window
         # ↓ find-word, line, start col, end col
         self.search.is_word: Optional[Tuple[str, int, int, int]] = None
+        self.search.index: Optional[WordIndex] = None
+        self.search.match_idx = 0
 
     def create_color_set(self, num, name):
         assert num < curses.COLOR_PAIRS, \
@@ -375,15 +745,25 @@ q       |quit
         else:
             return key
 
-    def get_all_items(self):
-        res_dirs = []
-        res_files = []
-        tv = TreeViewer('.', self.tv.get_contents,
-                        purepath=self.purepath, logger=logger)
-        for cpath, dirs, files in tv:
-            res_dirs += [str(cpath/d) for d in dirs]
-            res_files += [str(cpath/f) for f in files]
-        return res_dirs, res_files
+    @property
+    def dirs(self) -> List[str]:
+        return self.items.dirs
+
+    @dirs.setter
+    def dirs(self, dirs: List[str]) -> None:
+        self.items.dirs = dirs
+
+    @property
+    def files(self) -> List[str]:
+        return self.items.files
+
+    @files.setter
+    def files(self, files: List[str]) -> None:
+        self.items.files = files
+
+    def get_contents(self, path: PurePath) -> Tuple[List[str], List[str]]:
+        with self.lock:
+            return self.tv.get_contents(path)
 
     def get_title(self):
         return self.selected
@@ -452,23 +832,23 @@ q       |quit
 
     def _go_up_sidebar(self):
         if self.search.is_file:
-            self.dirs, self.files = self.tv.get_contents(self.cpath)
+            self.dirs, self.files = self.get_contents(self.cpath)
             self.init_var()
             self.search.is_file = False
         elif str(self.cpath) != '.':
             self.cpath = self.cpath.parent
-            self.dirs, self.files = self.tv.get_contents(self.cpath)
+            self.dirs, self.files = self.get_contents(self.cpath)
             self.init_var()
 
     def select_item(self, system):
         self.selected = self.sidebar.contents[self.sidebar.idx]
         self.search.is_word = None
-        if self.selected in self.dirs:
+        if self.sidebar.contents.is_dir(self.sidebar.idx):
             if self.search.is_file:
                 self.cpath = self.purepath(self.selected)
             else:
                 self.cpath = self.cpath/self.selected
-            dirs, files = self.tv.get_contents(self.cpath)
+            dirs, files = self.get_contents(self.cpath)
             if len(dirs+files) == 0:
                 self.message = ['empty directory.']
                 self.cpath = self.cpath.parent
@@ -484,15 +864,45 @@ q       |quit
                 fpath = str(self.cpath/self.selected)
             self.mainwin.ud = 0
             self.mainwin.lr = 0
-            # message of waiting for opening an item
-            self.message = ['opening an item...']
-            self.mainwin.update()
-            self.info = self.show_func(fpath, cui=True,
-                                       system=system, stdscr=self.stdscr)
-            self.message = self.info.message.split("\n")
-            self.message = [ln.replace("\t", "  ") for ln in self.message]
+            kwargs = dict(cui=True, system=system, stdscr=self.stdscr)
+            if not hasattr(self.show_func, 'cache_get') or \
+               self.show_func.cache_get(fpath, **kwargs) is None:
+                # message of waiting for opening an item
+                self.message = ['opening an item...']
+                self.mainwin.update()
+            with self.lock:
+                self.info = self.show_func(fpath, **kwargs)
+            self.message = LazyLines(self.info.message)
+
+    def get_lines(self) -> LineStore:
+        if self.lines.lines is not self.message:
+            self.lines = LineStore(self.message)
+        return self.lines
+
+    def prefetch_items(self):
+        # request the files near the cursor, nearest first.
+        state = (self.sidebar.idx, id(self.dirs), id(self.files),
+                 str(self.cpath), self.search.is_file)
+        if state == self.prefetch_state:
+            return
+        self.prefetch_state = state
+        paths = []
+        contents = self.sidebar.contents
+        for i in range(2*self.prefetch+1):
+            # idx, idx+1, idx-1, idx+2, ...
+            idx = self.sidebar.idx+(i+1)//2*(1 if i % 2 == 1 else -1)
+            if idx < 0 or idx >= len(contents) or contents.is_dir(idx):
+                continue
+            if is_image(contents[idx]):
+                continue
+            if self.search.is_file:
+                paths.append(contents[idx])
+            else:
+                paths.append(str(self.cpath/contents[idx]))
+        self.prefetcher.request(paths)
 
     def _down_main(self, num: int):
+        self.get_lines().fill(self.mainwin.ud+num+self.mainwin.h)
         if self.mainwin.ud < len(self.message)-num-1:
             self.mainwin.ud += num
         else:
@@ -505,6 +915,7 @@ q       |quit
             self.mainwin.ud -= num
 
     def _bottom_main(self):
+        self.get_lines().fill()
         self.mainwin.down(len(self.message)-self.mainwin.ud-2)
 
     def _top_main(self):
@@ -533,6 +944,24 @@ q       |quit
     def _doll_main(self):
         self.mainwin.right(self.mainwin.max_lr-self.mainwin.lr)
 
+    def show_file_candidates(self, matcher: FileMatcher, query: str,
+                             uly: int) -> None:
+        # show the matched items above the search box.
+        for i in range(1, uly-1):
+            self.mainwin.b.move(i, 0)
+            self.mainwin.b.clrtoeol()
+        if len(query) != 0:
+            nd, nf = matcher.match(query)
+            status = f'{nd+nf} items'
+            if not self.index.done.is_set():
+                status += ' (indexing...)'
+            self.mainwin.b.addnstr(1, 0, status, self.mainwin.w-1,
+                                   curses.color_pair(5))
+            for i, path in enumerate(matcher.top(uly-3)):
+                self.mainwin.b.addnstr(i+2, 1, path, self.mainwin.w-2)
+        self.mainwin.b.refresh()
+        self.search.b.refresh()
+
     def file_search(self):
         # file name search mode
         uly = self.mainwin.h-self.search.h-2
@@ -545,35 +974,39 @@ q       |quit
         self.mainwin.b.refresh()
         self.search.b.clear()
         box = Textbox(self.search.b)
-        box.edit(self.editer_cmd)
-        search_file = box.gather()
-        self.search.file = search_file.replace("\n", '').replace(" ", '')
+        matcher = FileMatcher(self.index)
+        query = ''
+        # same as Textbox.edit, but the candidates are updated by each key.
+        while True:
+            ch = self.editer_cmd(self.search.b.getch())
+            if not box.do_command(ch):
+                break
+            new_query = box.gather().replace("\n", '').replace(" ", '')
+            if new_query != query:
+                query = new_query
+                self.show_file_candidates(matcher, query, uly)
+            self.search.b.refresh()
+        self.search.file = query
         self.search.word = ''
         if len(self.search.file) == 0:
             self.mainwin.b.clear()
             self.mainwin.b.refresh()
         else:
-            old_files = self.files.copy()
-            old_dirs = self.dirs.copy()
-            dirs, files = self.get_all_items()
+            if not self.index.done.is_set():
+                self.mainwin.b.addnstr(1, 0, 'building the file index...',
+                                       self.mainwin.w-1, curses.color_pair(5))
+                self.mainwin.b.refresh()
+            self.index.wait()
+            matcher.match(self.search.file)
+            dirs, files = matcher.results()
             logger.debug('search files')
-            logger.debug(f'files: {files}')
-            logger.debug(f'dirs:  {dirs}')
-            self.files = []
-            self.dirs = []
-            for i, f in enumerate(files):
-                if re.search(self.search.file, f):
-                    self.files.append(f)
-            for i, d in enumerate(dirs):
-                if re.search(self.search.file, d):
-                    self.dirs.append(d)
-            if len(self.files)+len(self.dirs) != 0:
+            logger.debug(f'{len(files)} files, {len(dirs)} dirs')
+            if len(files)+len(dirs) != 0:
                 # find something
+                self.files = files
+                self.dirs = dirs
                 self.search.is_file = True
                 self.init_var()
-            else:
-                self.files = old_files
-                self.dirs = old_dirs
             self.key = ''
 
     def word_search(self):
@@ -597,63 +1030,47 @@ q       |quit
     def jump_search_word(self, reverse=False):
         if not self.search.word:
             return
+        lines = self.get_lines()
+        index = self.search.index
+        if index is None or index.word != self.search.word or \
+           index.lines is not lines:
+            index = WordIndex(self.search.word, lines)
+            self.search.index = index
         if self.search.is_word is None:
             if reverse:
-                start_line = self.mainwin.ud-1
+                idx = index.previous(self.mainwin.ud, 0)
             else:
-                start_line = self.mainwin.ud
-            start_col = 0
+                idx = index.next(self.mainwin.ud, -1)
         else:
-            start_line = self.search.is_word[1]
+            _, line, start, _ = self.search.is_word
             if reverse:
-                start_col = self.search.is_word[2]-1
-            else:
-                start_col = self.search.is_word[3]+1
-        if reverse:
-            lines = range(start_line, -1, -1)
-        else:
-            lines = range(start_line, len(self.message))
-        for i in lines:
-            if i == start_line:
-                if reverse:
-                    line = self.message[i][:start_col]
-                    shift = 0
-                else:
-                    line = self.message[i][start_col:]
-                    shift = start_col
+                idx = index.previous(line, start)
             else:
-                line = self.message[i]
-                shift = 0
+                idx = index.next(line, start)
+        if idx is None:
             self.search.cmt = f'"{self.search.word}" not found'
-            if reverse:
-                # find last match
-                tmpall = re.findall(self.search.word, line)
-                res = None
-                for tmpstr in tmpall:
-                    if res is None:
-                        tmpst = 0
-                    else:
-                        tmpst += res.end()
-                    res = re.search(self.search.word, line[tmpst:])
-            else:
-                tmpst = 0
-                res = re.search(self.search.word, line)
-            if res is not None:
-                found_word = res.group()
-                self.mainwin.down(i-self.mainwin.ud)
-                col = res.start()+shift+tmpst
-                if self.wrap:
-                    col = col % self.mainwin.textw
-                col -= self.mainwin.lr
-                if col < 0:
-                    self.mainwin.left(-col)
-                else:
-                    self.mainwin.right(col)
-                self.search.cmt = ''
-                self.search.is_word = (found_word, i,
-                                       shift+tmpst+res.start(),
-                                       shift+tmpst+res.end())
-                break
+            return
+        i, start, end = index.matches[idx]
+        self.mainwin.down(i-self.mainwin.ud)
+        col = start
+        if self.wrap:
+            col = col % self.mainwin.textw
+        col -= self.mainwin.lr
+        if col < 0:
+            self.mainwin.left(-col)
+        else:
+            self.mainwin.right(col)
+        self.search.cmt = ''
+        self.search.match_idx = idx
+        self.search.is_word = (lines.lines[i][start:end], i, start, end)
+
+    def get_search_status(self) -> str:
+        if self.search.cmt or self.search.is_word is None or \
+           self.search.index is None:
+            return self.search.cmt
+        return '"{}" {}/{}'.format(self.search.word,
+                                   self.search.match_idx+1,
+                                   self.search.index.count())
 
     def jump_search_word_next(self):
         self.jump_search_word(False)
@@ -701,10 +1118,10 @@ q       |quit
                 break
             cont = self.sidebar.contents[i+self.sidebar.ud]
             cidx = '{:2d} '.format(i+self.sidebar.ud)
-            if cont in self.dirs:
+            if self.sidebar.contents.is_dir(i+self.sidebar.ud):
                 self.sidebar.b.addstr(i, 0, cidx, curses.color_pair(6))
                 attr = curses.A_BOLD
-            elif cont in self.files:
+            else:
                 self.sidebar.b.addstr(i, 0, cidx, curses.color_pair(7))
                 attr = curses.A_NORMAL
             cont = cont[self.sidebar.lr:
@@ -715,6 +1132,9 @@ q       |quit
                 self.sidebar.b.addstr(i, len(cidx), cont, attr)
 
     def _update_main_window(self):
+        # read the lines shown in the window.
+        lines = self.get_lines()
+        lines.fill(self.mainwin.ud+self.mainwin.h)
         # show title
         title = self.get_title()
         self.mainwin.b.addnstr(0, 0, title, self.mainwin.w-1,
@@ -725,11 +1145,12 @@ q       |quit
         lentitle = len(title)+2
         if self.mainwin.w > lentitle:
             self.mainwin.b.addnstr(0, lentitle,
-                                  '{}/{}, {}; {}'.format(
+                                  '{}/{}{}, {}; {}'.format(
                                       self.mainwin.ud+1,
-                                      len(self.message),
+                                      len(lines),
+                                      '' if lines.complete else '+',
                                       self.mainwin.lr+1,
-                                      self.search.cmt,
+                                      self.get_search_status(),
                                       ),
                                    self.mainwin.w-lentitle-1,
                                    curses.color_pair(5))
@@ -738,36 +1159,28 @@ q       |quit
         else:
             main_col = curses.color_pair(1)
         # show contents
-        self.mainwin.lnwidth = len(str(len(self.message)))
+        self.mainwin.lnwidth = lines.lnwidth
+        if self.line_number:
+            textw = self.mainwin.w-self.mainwin.lnwidth-1
+            lr_st = self.mainwin.lnwidth+1
+        else:
+            textw = self.mainwin.w
+            lr_st = 0
+        textw -= 2
+        self.mainwin.textw = textw
         self.mainwin.max_lr = 0
         line_cnt = 1
-        for i in range(1, self.mainwin.h):
-            idx = i+self.mainwin.ud
-            if idx > len(self.message):
-                # reach the end of message
+        # only the lines in the window are rendered.
+        last = min(self.mainwin.ud+self.mainwin.h-1, len(lines))
+        for idx in range(self.mainwin.ud+1, last+1):
+            if line_cnt > self.mainwin.h-1:
                 break
-            if self.line_number:
-                textw = self.mainwin.w-self.mainwin.lnwidth-1
-            else:
-                textw = self.mainwin.w
-            textw -= 2
-            self.mainwin.textw = textw
-            if self.wrap:
-                messages = [self.message[idx-1][x:x+textw]
-                            for x in range(0, len(self.message[idx-1]), textw)
-                            ]
-                if len(messages) == 0:
-                    messages = ['']
-            else:
-                messages = [self.message[idx-1]]
+            messages = lines.rows(idx-1, textw, self.wrap,
+                                  self.mainwin.h-line_cnt)
             for j, msg in enumerate(messages):
                 if line_cnt > self.mainwin.h-1:
                     # over the displayable line
                     break
-                if self.line_number:
-                    lr_st = self.mainwin.lnwidth+1
-                else:
-                    lr_st = 0
                 if self.mainwin.max_lr <= len(msg):
                     self.mainwin.max_lr = len(msg)
                 msg = msg[self.mainwin.lr:]
@@ -840,11 +1253,17 @@ search_word   : {self.search.word}
                              self.sidebar.idx, len(self.message),
                              self.mainwin.ud, self.mainwin.lr))
         self.topwin.b.addstr(2, int(self.winx*2/3), ' '*(int(self.winx/3)-1))
+        debug_str = ''
         if self.search.is_word is not None:
-            self.topwin.b.addnstr(2, int(self.winx*2/3), '{:d}-{:d}'.format(
-                                  self.search.is_word[1],
-                                  self.search.is_word[2]),
-                                  int(self.winx/3)-1)
+            debug_str += '{:d}-{:d} '.format(self.search.is_word[1],
+                                             self.search.is_word[2])
+        if hasattr(self.show_func, 'cache_info'):
+            # hits, misses, items, and size of the result cache.
+            hits, misses, num, nbytes = self.show_func.cache_info()
+            debug_str += 'c:{}/{} {}({:.1f}MB)'.format(hits, hits+misses,
+                                                      num, nbytes/1024**2)
+        self.topwin.b.addnstr(2, int(self.winx*2/3), debug_str,
+                              int(self.winx/3)-1)
         self.topwin.b.refresh()
 
     def add_key_maps(self, key, config):
@@ -864,32 +1283,45 @@ search_word   : {self.search.word}
         self.stdscr.clear()
         self.init_win()
         self.set_color()
-        self.dirs, self.files = tv.get_contents(cpath)
-        self.sidebar.contents = self.dirs+self.files
+        self.dirs, self.files = self.get_contents(cpath)
+        # the file index for the file name search.
+        self.index = FileIndex(tv.get_contents, self.purepath, self.lock)
+        self.index.start()
+        if self.prefetch and hasattr(show_func, 'cache_get'):
+            self.prefetcher = Prefetcher(show_func, self.lock,
+                                         cui=True, system=False,
+                                         stdscr=self.stdscr)
         self.set_keymap()
         stdscr.refresh()
 
-        while self.key != 'q':
-            # showed indices are sidebar.ud ~ sidebar.ud+sidebar.h
-            if self.key == '':
-                upm, upt, ups = True, True, True
-            else:
-                upm, upt, ups = False, False, False
-            if self.key in self.keymaps:
-                func, args, _, _, upm, upt, ups = self.keymaps[self.key]
-                func(*args)
-
-            self.sidebar.contents = self.dirs+self.files
-
-            if upm:
-                self.mainwin.update()
-            if upt:
-                self.topwin.update()
-            if ups:
-                self.sidebar.update()
-            if GLOBAL_CONF.debug:
-                self.debug_info()
-            self.key = self.stdscr.getkey()
+        try:
+            while self.key != 'q':
+                # showed indices are sidebar.ud ~ sidebar.ud+sidebar.h
+                if self.key == '':
+                    upm, upt, ups = True, True, True
+                else:
+                    upm, upt, ups = False, False, False
+                if self.key in self.keymaps:
+                    func, args, _, _, upm, upt, ups = self.keymaps[self.key]
+                    func(*args)
+                if self.prefetcher is not None:
+                    self.prefetch_items()
+
+                if upm:
+                    self.mainwin.update()
+                if upt:
+                    self.topwin.update()
+                if ups:
+                    self.sidebar.update()
+                if GLOBAL_CONF.debug:
+                    self.debug_info()
+                self.key = self.stdscr.getkey()
+        finally:
+            # stop the background threads before the file is closed.
+            with self.lock:
+                self.index.stop()
+                if self.prefetcher is not None:
+                    self.prefetcher.stop()
 
 
 def interactive_cui(fname: str, get_contents: GC, show_func: SF,
@@ -915,7 +1347,8 @@ def interactive_cui(fname: str, get_contents: GC, show_func: SF,
         Please see the wiki for possible keywords.
         The return value is the ReturnMessage. It is treated as
         an error message if ReturnMessage.error is True. Otherwise, it is
-        treated as a standard message.
+        treated as a standard message. The message can be a sequence or
+        an iterator of lines, which are read as the main window scrolls.
     purepath: PurePath, PurePosixPath, or PureWindowsPath
         Specify the class to treat the path-like object.
         This is because in some case, the separator shoud be '/' not '\\'
@@ -927,6 +1360,7 @@ def interactive_cui(fname: str, get_contents: GC, show_func: SF,
     """
     cpath = purepath('.')
     tv = TreeViewer('.', get_contents, purepath=purepath, logger=logger)
+    show_func = cache_show_func(show_func)
     curses_cui = CursesCUI(purepath)
     curses_cui.disable_stream_handler()
     try:
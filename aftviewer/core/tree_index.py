@@ -0,0 +1,49 @@
+from typing import Any, Callable, Dict, Iterable, List, Tuple, TypeVar
+from logging import getLogger
+
+from . import GLOBAL_CONF
+
+logger = getLogger(GLOBAL_CONF.logname)
+Item = TypeVar('Item')
+# parent path -> (sorted directory names, sorted file names)
+Tree = Dict[str, Tuple[List[str], List[str]]]
+
+
+def split_name(name: str) -> List[str]:
+    # "./dir/file" and "dir/" are treated as "dir/file" and "dir".
+    return [p for p in name.split('/') if p not in ('', '.')]
+
+
+def build_index(items: Iterable[Item], get_name: Callable[[Item], str],
+                is_dir: Callable[[Item], bool],
+                is_file: Callable[[Item], bool] = lambda item: True,
+                ) -> Tuple[Tree, Dict[str, Item]]:
+    # scan the items of an archive only once and return the
+    # parent -> children map and the map of the normalized names to items.
+    # directories that have no explicit entry are also added.
+    tmp_tree: Dict[str, Tuple[set, set]] = {'.': (set(), set())}
+    named_items: Dict[str, Any] = {}
+    for item in items:
+        parts = split_name(get_name(item))
+        if len(parts) == 0:
+            continue
+        # the same name may appear several times. the last one is used,
+        # same as tarfile.TarFile.getmember.
+        named_items['/'.join(parts)] = item
+        parent = '.'
+        for p in parts[:-1]:
+            tmp_tree[parent][0].add(p)
+            parent = p if parent == '.' else f'{parent}/{p}'
+            tmp_tree.setdefault(parent, (set(), set()))
+        dirs, files = tmp_tree[parent]
+        if is_dir(item):
+            dirs.add(parts[-1])
+            tmp_tree.setdefault('/'.join(parts), (set(), set()))
+        elif is_file(item):
+            files.add(parts[-1])
+    tree: Tree = {}
+    for parent, (dirs, files) in tmp_tree.items():
+        tree[parent] = (sorted(dirs), sorted(files))
+    logger.debug(f'indexed {len(named_items)} items,'
+                 f' {len(tree)} directories')
+    return tree, named_items
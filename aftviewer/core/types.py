@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Union, Callable, Optional, Iterable
+from typing import List, Union, Callable, Optional, Iterable, Sequence, \
+    Iterator
 
 
 @dataclass(frozen=True)
@@ -36,12 +37,16 @@ class ReturnMessage:
     class for returned message.
 
     Attributes:
-    message: str
-        returned message.
+    message: str, sequence of str, or iterator of str
+        returned message. Large messages can be given as a sequence
+        (supporting len() and random access) or an iterator of lines
+        (without line breaks). They are read on demand in the CUI and
+        printed line by line in the interactive mode.
+        Error messages should be str.
     error: bool
         True if this message is an error.
     """
-    message: str
+    message: Union[str, Sequence[str], Iterator[str]]
     error: bool
 
 
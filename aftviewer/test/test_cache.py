@@ -0,0 +1,88 @@
+# test the disk cache in core/cache.py.
+import os
+import threading
+import dataclasses
+
+import pytest
+
+from aftviewer.core import cache
+from aftviewer.core.cache import ContentsCache, load_cache, save_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    conf = dataclasses.replace(cache.GLOBAL_CONF, conf_dir=tmp_path/'conf')
+    monkeypatch.setattr(cache, 'GLOBAL_CONF', conf)
+    monkeypatch.setattr(cache, 'get_config', lambda key1, key2: 1)
+    return tmp_path/'conf'/'cache'
+
+
+def test_contents_cache(cache_dir, tmp_path):
+    fpath = tmp_path/'test.dat'
+    fpath.write_text('data')
+    tree = {'.': (['a'], ['b']), 'a': ([], ['c', 'd'])}
+    called = []
+
+    def get_contents(path):
+        called.append(str(path))
+        return tree[str(path)]
+
+    gc = ContentsCache(fpath, 'test', get_contents)
+    assert gc('.') == (['a'], ['b'])
+    assert gc('a') == ([], ['c', 'd'])
+    assert gc('a') == ([], ['c', 'd'])
+    assert called == ['.', 'a']
+    gc.save()
+
+    # the results are read from the disk.
+    gc = ContentsCache(fpath, 'test', get_contents)
+    assert gc('.') == (['a'], ['b'])
+    assert gc('a') == ([], ['c', 'd'])
+    assert called == ['.', 'a']
+
+    # the cache is not used after the file is modified.
+    fpath.write_text('modified data')
+    gc = ContentsCache(fpath, 'test', get_contents)
+    assert gc('.') == (['a'], ['b'])
+    assert called == ['.', 'a', '.']
+
+
+def test_contents_cache_thread(cache_dir, tmp_path):
+    # save() is called while another thread adds the contents.
+    fpath = tmp_path/'test.dat'
+    fpath.write_text('data')
+    gc = ContentsCache(fpath, 'test', lambda path: ([], [str(path)]))
+    num = 20000
+
+    def add_contents():
+        for i in range(num):
+            gc(f'dir{i}')
+
+    th = threading.Thread(target=add_contents)
+    th.start()
+    while th.is_alive():
+        gc.save()
+    th.join()
+    gc.save()
+    gc = ContentsCache(fpath, 'test', lambda path: ([], []))
+    assert len(gc.contents) == num
+
+
+def test_cache_eviction(cache_dir, tmp_path):
+    data = 'x'*(400*1024)
+    fpaths = []
+    for i in range(4):
+        fpath = tmp_path/f'test{i}.dat'
+        fpath.write_text(str(i))
+        fpaths.append(fpath)
+        save_cache(fpath, 'test', data)
+        # make the order of the modification time clear.
+        for j, fp in enumerate(fpaths):
+            cache_path = cache.get_cache_path(fp, 'test')
+            if cache_path.exists():
+                os.utime(cache_path, ns=(j*10**9, j*10**9))
+    # only the latest two files are kept under 1 MB.
+    assert load_cache(fpaths[0], 'test') is None
+    assert load_cache(fpaths[1], 'test') is None
+    assert load_cache(fpaths[2], 'test') == data
+    assert load_cache(fpaths[3], 'test') == data
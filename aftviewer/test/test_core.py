@@ -1,12 +1,20 @@
 # test functions in viewers/core/__init__.py
+import os
+import sys
+import json
 import argparse
 import warnings
+import subprocess
+from collections import OrderedDict, defaultdict, namedtuple
 
 import pytest
 
 from . import chk_deps
 
-from aftviewer.core import args_chk, load_lib
+from aftviewer.core import args_chk, load_lib, limited_pformat, \
+    cache_show_func
+from aftviewer.core.types import ReturnMessage
+from aftviewer.core.tree_index import split_name, build_index
 from aftviewer.core.helpmsg import add_args_imageviewer, add_args_encoding, \
     add_args_output, add_args_verbose, add_args_key, add_args_interactive, \
     add_args_cui
@@ -74,3 +82,86 @@ def test_loadlib(filetype):
     if not hasattr(lib, 'show_help'):
         warnings.warn(f'showing help is not supported; {args.type}')
     assert hasattr(lib, 'main')
+
+
+def test_limited_pformat():
+    # default limits in default.json.
+    data = {'a': list(range(10**6)), 'b': 'x'*10}
+    res = limited_pformat(data)
+    assert '...(999000 more)' in res
+    assert "'b': 'xxxxxxxxxx'" in res
+    res = limited_pformat({i: i for i in range(10**6)})
+    assert res.endswith('...(999000 more): ...}')
+    data = []
+    data.append(data)
+    assert 'Recursion' in limited_pformat(data)
+    # subclasses of the containers are also truncated and kept.
+    data = OrderedDict((f'k{i}', i) for i in range(10**6))
+    res = limited_pformat(data)
+    assert res.startswith('OrderedDict(')
+    assert '(...(999000 more), ...)' in res
+    data = defaultdict(list, {'a': list(range(10**6))})
+    res = limited_pformat(data)
+    assert res.startswith('defaultdict(')
+    assert '...(999000 more)' in res
+    Point = namedtuple('Point', ['x', 'y'])
+    res = limited_pformat(Point(list(range(10**6)), 1))
+    assert res.startswith('Point(x=')
+    assert '...(999000 more)' in res
+
+
+def test_cache_show_func():
+    calls = []
+
+    def show_func(path, **kwargs):
+        calls.append(path)
+        return ReturnMessage(f'message of {path}', path == 'error')
+
+    sf = cache_show_func(show_func)
+    for path in ['a', 'b', 'a', 'error', 'error']:
+        sf(path, cui=True)
+    sf('a', cui=True, system=True)
+    assert calls == ['a', 'b', 'error', 'error', 'a']
+    # image files are shown by the image viewer every time.
+    sf('dir/image.png', cui=True)
+    sf('dir/image.png', cui=True)
+    assert calls[-2:] == ['dir/image.png', 'dir/image.png']
+    assert sf.cache_get('b', cui=True).message == 'message of b'
+    assert sf.cache_get('b', cui=False) is None
+    hits, misses, num, nbytes = sf.cache_info()
+    assert (hits, misses, num) == (1, 4, 2)
+
+
+def test_setting_config(tmp_path):
+    conf_dir = tmp_path/'aftviewer'
+    conf_dir.mkdir()
+    env = dict(os.environ)
+    env['XDG_CONFIG_HOME'] = str(tmp_path)
+    code = 'from aftviewer.core import get_config\n' \
+        'print(get_config("config", "result_cache_mb"))\n' \
+        'print(get_config("mytype", "opt"))\n' \
+        'try:\n' \
+        '    get_config("unknown", "opt")\n' \
+        'except AssertionError:\n' \
+        '    print("error")'
+    with open(conf_dir/'setting.json', 'w') as f:
+        json.dump({'config': {'result_cache_mb': 1},
+                   'additional_types': {'mytype': 'myz'},
+                   'mytype': {'opt': 2}}, f)
+    res = subprocess.run([sys.executable, '-c', code], env=env,
+                         capture_output=True, text=True, check=True)
+    assert res.stdout.split() == ['1', '2', 'error']
+    # nothing is written in the config directory.
+    assert os.listdir(conf_dir) == ['setting.json']
+
+
+def test_tree_index():
+    items = [('./a/b.txt', False), ('c/', True), ('d.txt', False),
+             ('e/f/', True), ('d.txt', False)]
+    tree, named = build_index(items, lambda i: i[0], lambda i: i[1])
+    assert tree['.'] == (['a', 'c', 'e'], ['d.txt'])
+    assert tree['a'] == ([], ['b.txt'])
+    assert tree['e'] == (['f'], [])
+    assert tree['e/f'] == ([], [])
+    assert sorted(named) == ['a/b.txt', 'c', 'd.txt', 'e/f']
+    assert split_name('./a//b/') == ['a', 'b']
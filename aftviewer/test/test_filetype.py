@@ -0,0 +1,182 @@
+# test the file type detection in core/__init__.py.
+import io
+import os
+import bz2
+import gzip
+import lzma
+import time
+import pickle
+import sqlite3
+import struct
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+import aftviewer.core as core
+from aftviewer.core import get_filetype
+
+
+def make_tar(fpath: Path, mode: str) -> None:
+    data = b'tar member\n'
+    with tarfile.open(fpath, mode) as tar:
+        info = tarfile.TarInfo('member.txt')
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+
+
+def make_v7_tar(fpath: Path) -> None:
+    # remove the magic of the ustar format and set the checksum again.
+    make_tar(fpath, 'w')
+    data = bytearray(fpath.read_bytes())
+    data[257:265] = b'\0'*8
+    data[148:156] = b' '*8
+    data[148:155] = f'{sum(data[:512]):06o}\0'.encode()
+    fpath.write_bytes(bytes(data))
+
+
+def make_sqlite(fpath: Path) -> None:
+    con = sqlite3.connect(fpath)
+    con.execute('create table test (a, b)')
+    con.commit()
+    con.close()
+
+
+def make_npy_bytes() -> bytes:
+    header = "{'descr': '<i8', 'fortran_order': False, 'shape': (2,), }"
+    header = header.ljust(118) + '\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + \
+        header.encode() + struct.pack('<2q', 1, 2)
+
+
+def make_npz(fpath: Path) -> None:
+    with zipfile.ZipFile(fpath, 'w') as zf:
+        zf.writestr('arr_0.npy', make_npy_bytes())
+
+
+def make_zip(fpath: Path) -> None:
+    with zipfile.ZipFile(fpath, 'w') as zf:
+        zf.writestr('member.txt', 'zip member\n')
+
+
+def make_stl_binary(fpath: Path) -> None:
+    num = 3
+    fpath.write_bytes(b'\0'*80 + struct.pack('<I', num) + b'\1'*50*num)
+
+
+def make_stl_ascii(fpath: Path) -> None:
+    fpath.write_text('solid test\n facet normal 0 0 1\n  outer loop\n'
+                     '   vertex 0 0 0\n   vertex 1 0 0\n   vertex 0 1 0\n'
+                     '  endloop\n endfacet\nendsolid test\n')
+
+
+def make_fits(fpath: Path) -> None:
+    cards = ['SIMPLE  =                    T',
+             'BITPIX  =                    8',
+             'NAXIS   =                    0',
+             'END']
+    fpath.write_bytes(''.join(c.ljust(80) for c in cards).ljust(2880)
+                      .encode())
+
+
+def make_hdf5(fpath: Path) -> None:
+    # superblock after a user block of 512 bytes.
+    fpath.write_bytes(b'\0'*512 + b'\x89HDF\r\n\x1a\n' + b'\0'*100)
+
+
+corpus = [
+    ('tar', lambda fp: make_tar(fp, 'w')),
+    ('tar', make_v7_tar),
+    ('tar', lambda fp: make_tar(fp, 'w:gz')),
+    ('tar', lambda fp: make_tar(fp, 'w:bz2')),
+    ('tar', lambda fp: make_tar(fp, 'w:xz')),
+    ('zip', make_zip),
+    ('numpy', make_npz),
+    ('numpy', lambda fp: fp.write_bytes(make_npy_bytes())),
+    ('sqlite3', make_sqlite),
+    ('fits', make_fits),
+    ('stl', make_stl_binary),
+    ('stl', make_stl_ascii),
+    ('hdf5', make_hdf5),
+    ('pickle', lambda fp: fp.write_bytes(pickle.dumps({'a': 1}, 2))),
+    ('pickle', lambda fp: fp.write_bytes(pickle.dumps({'a': 1}, 5))),
+    ('xpm', lambda fp: fp.write_text('/* XPM */\nstatic char *x[] = {};\n')),
+    (None, lambda fp: fp.write_bytes(gzip.compress(b'not tar'*1000))),
+    (None, lambda fp: fp.write_bytes(bz2.compress(b'not tar'*1000))),
+    (None, lambda fp: fp.write_bytes(lzma.compress(b'not tar'*1000))),
+    (None, lambda fp: fp.write_bytes(os.urandom(3000))),
+]
+
+
+@pytest.mark.parametrize(('expected', 'make_file'), corpus)
+def test_sniff_filetype(expected, make_file, tmp_path):
+    # files without extensions are detected by the magic numbers.
+    fpath = tmp_path/'sample'
+    make_file(fpath)
+    assert get_filetype(fpath) == expected
+
+
+@pytest.mark.parametrize(('fname', 'expected'), [
+    ('sample.pkl', 'pickle'),  # protocol 0 has no magic number.
+    ('sample.ipynb', 'jupyter'),
+    ('sample.txt', 'text'),
+    ('sample.unknown', None),
+    ])
+def test_filetype_extension(fname, expected, tmp_path):
+    fpath = tmp_path/fname
+    fpath.write_bytes(pickle.dumps([1, 2], 0))
+    assert get_filetype(fpath) == expected
+
+
+@pytest.mark.parametrize(('fname', 'make_file', 'expected'), [
+    # zip files whose first member is a npy file.
+    ('sample.zip', make_npz, 'zip'),
+    ('sample.npz', make_npz, 'numpy'),
+    # the extensions have priority to the magic numbers except for tar.
+    ('sample.npy', make_zip, 'numpy'),
+    ('sample.npz', lambda fp: make_tar(fp, 'w'), 'tar'),
+    ])
+def test_filetype_priority(fname, make_file, expected, tmp_path):
+    fpath = tmp_path/fname
+    make_file(fpath)
+    assert get_filetype(fpath) == expected
+
+
+def test_filetype_additional(tmp_path, monkeypatch):
+    # extensions of the additional types are checked after the tar files
+    # and the built-in types, same as before the magic numbers were used.
+    core.get_config('config', 'pp_kwargs')  # load the configuration.
+    type_config = dict(getattr(core, '__type_config'))
+    type_config['mytype'] = 'myz npz'
+    monkeypatch.setattr(core, '__type_config', type_config)
+    fpath = tmp_path/'sample.myz'
+    make_zip(fpath)
+    assert get_filetype(fpath) == 'mytype'
+    make_npz(tmp_path/'sample.npz')
+    assert get_filetype(tmp_path/'sample.npz') == 'numpy'
+    make_tar(tmp_path/'tar.myz', 'w')
+    assert get_filetype(tmp_path/'tar.myz') == 'tar'
+    assert get_filetype(tmp_path/'sample.zip') is None
+    make_zip(tmp_path/'sample.zip')
+    assert get_filetype(tmp_path/'sample.zip') == 'zip'
+
+
+def test_filetype_benchmark(tmp_path):
+    files = []
+    for i, (expected, make_file) in enumerate(corpus):
+        fpath = tmp_path/f'sample{i}'
+        make_file(fpath)
+        files.append(fpath)
+    # large compressed file which is not a tar file.
+    fpath = tmp_path/'large'
+    fpath.write_bytes(gzip.compress(os.urandom(1 << 21), 1))
+    files.append(fpath)
+
+    num = 20
+    start = time.perf_counter()
+    for i in range(num):
+        for fpath in files:
+            get_filetype(fpath)
+    ave = (time.perf_counter()-start)/num/len(files)
+    assert ave < 5e-3, f'average time: {ave*1e3:.2f} ms'
@@ -0,0 +1,64 @@
+# test the start-up cost of the command line tools.
+import sys
+import subprocess
+import os
+
+import pytest
+
+# modules which should not be imported until they are used.
+lazy_modules = [
+    'aftviewer.core.cui',
+    'aftviewer.core.helpmsg',
+    'aftviewer.core.image_viewer',
+    'aftviewer.viewers',
+    'pymeflib.tree2',
+    'curses',
+    'tarfile',
+    'pprint',
+]
+
+
+def run_python(code, conf_home, *opts):
+    env = dict(os.environ)
+    env['XDG_CONFIG_HOME'] = str(conf_home)
+    return subprocess.run([sys.executable, *opts, '-c', code], env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def test_lazy_config(tmp_path):
+    # the configuration is not loaded by importing the command line tool.
+    code = 'import aftviewer.cli\n' \
+        'import aftviewer.core\n' \
+        'print("GLOBAL_CONF" in vars(aftviewer.core))'
+    res = run_python(code, tmp_path)
+    assert res.stdout.splitlines()[-1] == 'False'
+
+
+@pytest.mark.parametrize(('code'), [
+    ('import aftviewer'),
+    ('import aftviewer.cli'),
+    ('from aftviewer.cli import get_types\n'
+     'import sys\n'
+     'sys.argv = ["_get_aftviewer_types", "type"]\n'
+     'get_types()'),
+    ])
+def test_lazy_import(code, tmp_path):
+    code += '\nimport sys\nprint(" ".join(sys.modules.keys()))'
+    res = run_python(code, tmp_path)
+    loaded = res.stdout.splitlines()[-1].split()
+    for mod in lazy_modules:
+        assert mod not in loaded, f'{mod} is imported by "{code}"'
+    # config directory is not created at import time.
+    assert not (tmp_path/'aftviewer').exists()
+
+
+def test_import_time(tmp_path):
+    # cumulative import time of aftviewer.cli in us (best of 3 runs).
+    times = []
+    for i in range(3):
+        res = run_python('import aftviewer.cli', tmp_path, '-X', 'importtime')
+        for line in res.stderr.splitlines():
+            if line.split('|')[-1].strip() == 'aftviewer.cli':
+                times.append(int(line.split('|')[1]))
+    assert len(times) == 3
+    assert min(times) < 200000, f'import time: {min(times)} us'
@@ -0,0 +1,54 @@
+# test the block-wise statistics used in numpy, np_pickle, and hdf5,
+# and the member cache of npz files.
+import warnings
+
+import pytest
+
+from . import chk_deps
+
+
+@pytest.mark.parametrize(('block_size'), [1, 7, 1000])
+def test_block_stats(block_size):
+    if not chk_deps('numpy'):
+        warnings.warn('skip cheking block stats')
+        return
+    import numpy as np
+    from aftviewer.viewers.numpy import block_stats
+
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(31, 5))
+    data[rng.random(data.shape) < 0.2] = np.nan
+    res = block_stats(data, std=True, percentile=True,
+                      block_size=block_size)
+    assert res.size == data.size
+    assert res.nan == np.count_nonzero(np.isnan(data))
+    assert np.isclose(res.mean, np.nanmean(data))
+    assert np.isclose(res.std, np.nanstd(data))
+    assert res.max == np.nanmax(data)
+    assert res.min == np.nanmin(data)
+
+    data = np.arange(100).reshape(10, 10)
+    res = block_stats(data, block_size=block_size)
+    assert res.nan == 0
+    assert res.mean == np.mean(data)
+    assert res.max == 99 and res.min == 0
+
+
+@pytest.mark.parametrize(('cache_mb'), [None, 0, 1])
+def test_npz_cache(cache_mb, tmp_path, monkeypatch):
+    if not chk_deps('numpy'):
+        warnings.warn('skip cheking npz cache')
+        return
+    import numpy as np
+    import aftviewer.viewers.numpy as np_viewer
+
+    monkeypatch.setattr(np_viewer, 'get_config',
+                        lambda key1, key2: cache_mb)
+    fpath = tmp_path/'test.npz'
+    np.savez(fpath, a=np.arange(10), b=np.ones((2, 3)))
+    with np.load(fpath) as npz:
+        cache = np_viewer.NpzCache(npz)
+        assert 'a' in cache and 'c' not in cache
+        assert cache.header('b')[0] == (2, 3)
+        assert np.array_equal(cache['a'], np.arange(10))
+        assert len(cache.members) == (0 if not cache_mb else 1)
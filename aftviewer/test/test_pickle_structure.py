@@ -0,0 +1,31 @@
+# test the structure scanner of pickle files.
+import io
+import pickle
+from collections import OrderedDict
+
+import pytest
+
+
+class Reduced():
+    def __reduce__(self):
+        # this must not be called while scanning.
+        return (exec, ('raise RuntimeError("executed")',))
+
+
+@pytest.mark.parametrize(('protocol'), range(pickle.HIGHEST_PROTOCOL+1))
+def test_scan_structure(protocol):
+    from aftviewer.viewers.pickle import scan_structure
+
+    data = {'a': {'x': 1, 'y': 2}, 'b': list(range(2000)), 'c': 's'*1000,
+            3: (1, 2), 'd': OrderedDict(a=1), 'e': Reduced()}
+    data['f'] = data['a']
+    root = scan_structure(io.BytesIO(pickle.dumps(data, protocol=protocol)))
+    assert root.type == 'dict'
+    assert root.size == len(data)
+    items = dict(root.items)
+    assert list(items.keys()) == list(data.keys())
+    assert str(items['a']) == 'dict (2 items)'
+    assert str(items['b']) == 'list (2000 items)'
+    assert str(items[3]) == 'tuple (2 items)'
+    assert str(items['d']) == 'collections.OrderedDict (1 items)'
+    assert items['f'] is items['a']
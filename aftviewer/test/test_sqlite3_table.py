@@ -0,0 +1,31 @@
+# test the table output of sqlite3 read by chunks.
+import warnings
+
+from aftviewer.viewers.sqlite3 import table_lines, is_tabulate
+
+
+def test_table_lines():
+    if not is_tabulate:
+        warnings.warn('skip cheking sqlite3 table')
+        return
+    from tabulate import tabulate
+
+    headers = ['id', 'name', 'value']
+    rows = [(i, f'item{i%7}', None if i % 5 == 0 else i*1.5)
+            for i in range(25)]
+    expected = ['  '+line for line in
+                tabulate(rows, headers, tablefmt='orgtbl').split('\n')]
+    # the headers are shown once, and the rows are aligned as one table.
+    lines = list(table_lines([rows[:10], rows[10:20], rows[20:]], headers))
+    assert lines == expected
+    # longer values after the first chunk are cut to the same widths.
+    wide = [(1000, 'n,"1000', 500), (1001, 'x'*20, 123456789.25)]
+    lines = list(table_lines([rows[:10], wide], headers))
+    assert lines[:12] == expected[:12]
+    assert len(set(len(line) for line in lines)) == 1
+    assert lines[-2] == '  | 1000 | n,"... |   500   |'
+    assert lines[-1].startswith('  | 1001 | xxx... | ')
+    assert lines[-1].endswith('... |')
+    lines = list(table_lines([], headers))
+    assert lines == ['  '+line for line in
+                     tabulate([], headers, tablefmt='orgtbl').split('\n')]
@@ -1,6 +1,9 @@
 import os
 import pprint
+import multiprocessing
+from itertools import product
 from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import PurePosixPath
 from logging import getLogger
 
@@ -8,8 +11,8 @@ import h5py
 
 from .. import (GLOBAL_CONF, args_chk, print_key, print_error,
                 FG, BG, FG256, BG256, END, set_numpy_format, get_config,
-                interactive_view, interactive_cui,
-                help_template, add_args_specification
+                interactive_view, interactive_cui, ContentsCache,
+                help_template, add_args_specification, limited_pformat
                 )
 from .. import ReturnMessage as RM
 from pymeflib.tree2 import show_tree
@@ -21,10 +24,94 @@ except ImportError:
 else:
     imp_np = True
     set_numpy_format(np)
+    from .numpy import BlockStats
 logger = getLogger(GLOBAL_CONF.logname)
 pargs = get_config('config', 'pp_kwargs')
 
 
+def read_preview(dset):
+    # read only the edges of a large dataset, like the summarized repr of
+    # NumPy. return the data and if the data is summarized or not.
+    shape = dset.shape
+    if not imp_np or shape is None or len(shape) == 0:
+        return dset[()], False
+    opts = np.get_printoptions()
+    if dset.size <= opts['threshold']:
+        return dset[()], False
+    edge = opts['edgeitems']
+    new_shape = []
+    sels = []
+    for n in shape:
+        if n > 2*edge:
+            # the center item is never shown.
+            new_shape.append(2*edge+1)
+            sels.append([(slice(0, edge), slice(0, edge)),
+                         (slice(n-edge, n), slice(edge+1, 2*edge+1))])
+        else:
+            new_shape.append(n)
+            sels.append([(slice(0, n), slice(0, n))])
+    data = np.zeros(new_shape, dtype=dset.dtype)
+    for sel in product(*sels):
+        src = tuple([s[0] for s in sel])
+        dst = tuple([s[1] for s in sel])
+        data[dst] = dset[src]
+    return data, True
+
+
+def format_preview(dset):
+    data, summarized = read_preview(dset)
+    if summarized:
+        edge = np.get_printoptions()['edgeitems']
+        with np.printoptions(threshold=0, edgeitems=edge):
+            res = pprint.pformat(data, **pargs)
+        # recent NumPy shows the shape of the summarized array.
+        return res.replace(f'shape={data.shape}', f'shape={dset.shape}')
+    else:
+        return pprint.pformat(data, **pargs)
+
+
+def get_chunks(dset):
+    # selections of the native chunks.
+    # contiguous datasets are read by blocks along the first axis.
+    if dset.chunks is not None:
+        return list(dset.iter_chunks())
+    row_size = int(np.prod(dset.shape[1:]))
+    rows = max(1, get_config('numpy', 'block_size')//max(row_size, 1))
+    return [(slice(i, i+rows),) for i in range(0, dset.shape[0], rows)]
+
+
+def calc_chunk_stats(fname, name, sels):
+    # this function is called in the child processes.
+    stats = BlockStats(std=True)
+    with h5py.File(fname, 'r') as h5_file:
+        dset = h5_file[name]
+        for sel in sels:
+            stats.update(dset[sel])
+    return stats
+
+
+def calc_stats(dset):
+    sels = get_chunks(dset)
+    nproc = get_config('hdf5', 'stats_processes')
+    if nproc is None or nproc <= 1 or len(sels) <= 1:
+        stats = BlockStats(std=True)
+        for sel in sels:
+            stats.update(dset[sel])
+        return stats
+
+    nproc = min(nproc, len(sels))
+    logger.info(f'calculate statistics with {nproc} processes')
+    stats = BlockStats(std=True)
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=nproc, mp_context=ctx) as executor:
+        futures = [executor.submit(calc_chunk_stats, dset.file.filename,
+                                   dset.name, sels[i::nproc])
+                   for i in range(nproc)]
+        for future in futures:
+            stats.merge(future.result())
+    return stats
+
+
 def show_hdf5(h5_file, cpath, **kwargs):
     if 'cui' in kwargs and kwargs['cui']:
         fg = ''
@@ -53,53 +140,60 @@ def show_hdf5(h5_file, cpath, **kwargs):
     res = []
     res.append(f'{fg}{bg}attrs{end}')
     for attr in data.attrs:
-        res.append(f'{attr}: {data.attrs[attr]}')
+        val = data.attrs[attr]
+        if imp_np and isinstance(val, (np.ndarray, np.generic)):
+            # NumPy summarizes the large array by itself.
+            res.append(f'{attr}: {val}')
+        else:
+            res.append(f'{attr}: {limited_pformat(val, **pargs)}')
     if isinstance(data, h5py.Group):
         res.append(f'{fg}{bg}contents{end}')
         for k in data.keys():
             res.append(k)
     elif isinstance(data, h5py.Dataset):
         res.append(f'{fg}{bg}value{end}')
-        data = data[()]
-        res.append(pprint.pformat(data, **pargs))
-        if hasattr(data, 'shape'):
-            res.append(f'shape: {data.shape}')
-            is_array = True
-        elif hasattr(data, '__len__'):
-            res.append(f'len: {len(data)}')
-            is_array = True
-        else:
+        res.append(format_preview(data))
+        # information from metadata
+        res.append(f'shape: {data.shape}')
+        res.append(f'dtype: {data.dtype}')
+        if data.chunks is not None:
+            res.append(f'chunks: {data.chunks}')
+        if data.compression_opts is not None:
+            res.append(f'compression: {data.compression}'
+                       f' ({data.compression_opts})')
+        elif data.compression is not None:
+            res.append(f'compression: {data.compression}')
+        if data.shape is None or len(data.shape) == 0 or data.size == 0:
             is_array = False
-        if imp_np and is_array and (len(data) != 0):
-            try:
-                res.append(f'mean : {np.nanmean(data)}')
-            except Exception as e:
-                logger.debug(f'{type(e).__name__}: {e}')
-            try:
-                res.append(f' max : {np.nanmax(data)}')
-            except Exception as e:
-                logger.debug(f'{type(e).__name__}: {e}')
-            try:
-                res.append(f' min : {np.nanmin(data)}')
-            except Exception as e:
-                logger.debug(f'{type(e).__name__}: {e}')
+        else:
+            is_array = True
+        # the statistics are calculated by chunks, so the memory usage
+        # is bounded without the size limit (null).
+        max_size = get_config('hdf5', 'stats_max_size')
+        if imp_np and is_array and max_size is not None and \
+           data.size > max_size:
+            res.append(f'statistics are skipped (size {data.size} >'
+                       f' {max_size}). set hdf5.stats_max_size to null'
+                       ' or a larger value to show them.')
+        elif imp_np and is_array:
             try:
-                res.append(f' std : {np.nanstd(data)}')
+                stats = calc_stats(data)
             except Exception as e:
                 logger.debug(f'{type(e).__name__}: {e}')
-            if hasattr(data, 'shape'):
-                try:
-                    nan_rate = np.sum(np.isnan(data))/np.prod(data.shape)
-                    res.append(f'nan rate: {nan_rate*100:.1f}%')
-                except Exception:
-                    pass
+            else:
+                if stats.count != 0:
+                    res.append(f'mean : {stats.mean}')
+                    res.append(f' max : {stats.max}')
+                    res.append(f' min : {stats.min}')
+                    res.append(f' std : {stats.std}')
+                res.append(f'nan rate: {stats.nan_rate*100:.1f}%')
     return RM('\n'.join(res), False)
 
 
 def show_detail(h5_file, name, obj):
     if isinstance(obj, h5py.Dataset):
         print_key(name)
-        pprint.pprint(h5_file[name][()], **pargs)
+        print(format_preview(obj))
 
 
 def show_names(name, obj):
@@ -138,7 +232,7 @@ def main(fpath, args):
     fname = os.path.basename(fpath)
 
     h5_file = h5py.File(fpath, 'r')
-    gc = partial(get_contents, h5_file)
+    gc = ContentsCache(fpath, 'hdf5', partial(get_contents, h5_file))
     sf = partial(show_hdf5, h5_file)
 
     if args_chk(args, 'interactive'):
@@ -162,4 +256,5 @@ def main(fpath, args):
     else:
         show_tree(fname, gc, logger=logger, purepath=PurePosixPath)
 
+    gc.save()
     h5_file.close()
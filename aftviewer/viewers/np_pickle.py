@@ -8,12 +8,13 @@ from numpy.lib.npyio import NpzFile
 
 from .. import GLOBAL_CONF, args_chk, print_key, set_numpy_format, \
     get_config, interactive_view, interactive_cui, help_template, \
-    add_args_specification, add_args_encoding
+    add_args_specification, add_args_encoding, limited_pformat
 from .. import ReturnMessage as RM
-from .numpy import show_numpy
+from .numpy import show_numpy, NpzCache
 from .pickle import show_func as show_pickle, get_contents as get_pickle
 set_numpy_format(np)
 logger = getLogger(GLOBAL_CONF.logname)
+pargs = get_config('config', 'pp_kwargs')
 
 
 def show_func(data, path, **kwargs):
@@ -21,7 +22,11 @@ def show_func(data, path, **kwargs):
     if len(parts) < 1:
         return RM(' something wrong, path is too short.', True)
     if len(parts) == 1:
-        res = RM('{}'.format(data[parts[0]]), False)
+        value = data[parts[0]]
+        if value.dtype == np.dtype('O'):
+            res = RM(limited_pformat(value.tolist(), **pargs), False)
+        else:
+            res = RM('{}'.format(value), False)
     else:
         pdata = data[parts[0]]
         assert pdata.dtype == np.dtype('O'), f'incorrect type, {pdata.dtype}'
@@ -35,7 +40,8 @@ def get_contents(data, path):
     parts = PurePath(path).parts
     if len(parts) == 0:
         for k in data.keys():
-            if data[k].dtype == np.dtype('O'):
+            # read only the header.
+            if data.header(k)[2] == np.dtype('O'):
                 dirs.append(k)
             else:
                 files.append(k)
@@ -50,12 +56,13 @@ def get_contents(data, path):
 
 def show_data(data, key):
     print_key(key)
-    if data[key].dtype == np.dtype('O'):
+    value = data[key]
+    if value.dtype == np.dtype('O'):
         # object
-        print(data[key].item())
+        print(value.item())
     else:
-        print(data[key])
-        show_numpy(data[key])
+        print(value)
+        show_numpy(value)
 
 
 def add_args(parser):
@@ -83,6 +90,7 @@ def main(fpath, args):
     if type(data) is not NpzFile:
         print('please use --type numpy')
         return
+    data = NpzCache(data)
     fname = os.path.basename(fpath)
     gc = partial(get_contents, data)
     sf = partial(show_func, data)
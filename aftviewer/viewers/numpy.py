@@ -1,90 +1,351 @@
+import sys
+import zipfile
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 from numpy.lib.npyio import NpzFile
 
 from .. import args_chk, print_key, set_numpy_format, help_template, \
-    add_args_specification
+    add_args_specification, get_config
 set_numpy_format(np)
 
 
-def show_numpy(data):
-    # shape
-    dtype = data.dtype
+def read_header(fp):
+    # read only the header of the .npy format.
+    version = np.lib.format.read_magic(fp)
+    if version == (1, 0):
+        return np.lib.format.read_array_header_1_0(fp)
+    elif version == (2, 0):
+        return np.lib.format.read_array_header_2_0(fp)
+    else:
+        return None
+
+
+def show_header(dtype, shape, fortran_order=None):
     print('type     : {}'.format(dtype))
-    shape = data.shape
     print('shape    : {}'.format(shape))
-    if np.prod(shape) == 0:
-        print('  empty data.')
+    if fortran_order is not None:
+        print('fortran  : {}'.format(fortran_order))
+
+
+class NpzCache():
+    """
+    wrapper of NpzFile.
+    Loaded members are kept with LRU eviction so that each member is
+    decompressed at most once while it is in the cache.
+    header() reads only the header of a member from the zip stream.
+    """
+    def __init__(self, npz: NpzFile):
+        self.npz = npz
+        cache_mb = get_config('numpy', 'npz_cache_mb')
+        # null means no cache.
+        self.max_bytes = 0 if cache_mb is None else cache_mb*1024**2
+        self.names = set(npz.files)
+        self.nbytes = 0
+        self.members: OrderedDict = OrderedDict()
+        self.headers: dict = {}
+
+    def __iter__(self):
+        return iter(self.npz.files)
+
+    def __contains__(self, key):
+        return key in self.names
+
+    def keys(self):
+        return self.npz.files
+
+    def __getitem__(self, key):
+        if key in self.members:
+            self.members.move_to_end(key)
+            return self.members[key]
+        data = self.npz[key]
+        if 0 < self.max_bytes and data.nbytes <= self.max_bytes:
+            self.members[key] = data
+            self.nbytes += data.nbytes
+            while self.nbytes > self.max_bytes:
+                _, old = self.members.popitem(last=False)
+                self.nbytes -= old.nbytes
+        return data
+
+    def header(self, key):
+        # return shape, fortran order, and dtype.
+        if key in self.headers:
+            return self.headers[key]
+        if key in self.members:
+            data = self.members[key]
+            header = (data.shape, np.isfortran(data), data.dtype)
+        else:
+            # NameToInfo is a dict; namelist() makes a new list every time.
+            if f'{key}.npy' in self.npz.zip.NameToInfo:
+                name = f'{key}.npy'
+            else:
+                name = key
+            with self.npz.zip.open(name) as f:
+                header = read_header(f)
+            if header is None:
+                data = self[key]
+                header = (data.shape, np.isfortran(data), data.dtype)
+        self.headers[key] = header
+        return header
+
+
+class BlockStats():
+    """
+    statistics updated block by block in one pass.
+    count, NaN count, sum, max and min are computed from each block at once.
+    variance is merged by the pairwise (Welford/Chan) algorithm
+    if std is True. If sample_step > 0, every sample_step-th item is kept
+    to estimate percentiles.
+    The working set is one block, so this class can be used for memmap,
+    HDF5 datasets, or any array-like objects that support slicing.
+    """
+    def __init__(self, std=False, sample_step=0):
+        self.std_on = std
+        self.sample_step = sample_step
+        # number of all items
+        self.size = 0
+        # number of NaNs
+        self.nan = 0
+        # number of valid (not NaN) items
+        self.count = 0
+        self.sum = 0
+        # sum of squared differences from the mean
+        self.m2 = 0.0
+        self.max = None
+        self.min = None
+        self.samples = []
+
+    def update(self, block):
+        block = np.asarray(block).reshape(-1)
+        new = BlockStats(self.std_on)
+        new.size = block.size
+        if self.sample_step > 0:
+            start = (-self.size) % self.sample_step
+            sample = block[start::self.sample_step]
+        if np.issubdtype(block.dtype, np.inexact):
+            isnan = np.isnan(block)
+            new.nan = int(np.count_nonzero(isnan))
+            if new.nan != 0:
+                block = block[~isnan]
+                if self.sample_step > 0:
+                    sample = sample[~np.isnan(sample)]
+        new.count = block.size
+        if new.count != 0:
+            if np.issubdtype(block.dtype, np.complexfloating):
+                new.sum = block.sum(dtype=np.complex128)
+            elif np.issubdtype(block.dtype, np.number) or \
+                    block.dtype == np.bool_:
+                new.sum = block.sum(dtype=np.float64)
+            else:
+                raise TypeError(f'not supported type: {block.dtype}')
+            if self.std_on:
+                diff = block-new.sum/new.count
+                new.m2 = float(np.vdot(diff, diff).real)
+            new.max = block.max()
+            new.min = block.min()
+        if self.sample_step > 0 and sample.size != 0:
+            new.samples = [sample]
+        self.merge(new)
+
+    def merge(self, other):
+        if self.std_on and other.count != 0:
+            if self.count == 0:
+                self.m2 = other.m2
+            else:
+                count = self.count+other.count
+                delta = other.mean-self.mean
+                self.m2 += other.m2 + \
+                    abs(delta)**2*self.count*other.count/count
+        self.size += other.size
+        self.nan += other.nan
+        self.samples += other.samples
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.max = other.max
+            self.min = other.min
+        else:
+            self.max = max(self.max, other.max)
+            self.min = min(self.min, other.min)
+        self.count += other.count
+        self.sum += other.sum
+
+    @property
+    def mean(self):
+        if self.count == 0:
+            return np.nan
+        return self.sum/self.count
+
+    @property
+    def std(self):
+        if self.count == 0:
+            return np.nan
+        return np.sqrt(self.m2/self.count)
+
+    @property
+    def nan_rate(self):
+        if self.size == 0:
+            return np.nan
+        return self.nan/self.size
+
+    def percentile(self, q):
+        if len(self.samples) == 0:
+            return np.nan
+        return np.percentile(np.concatenate(self.samples), q)
+
+
+def iter_blocks(data, block_size=None):
+    # slice the data along the first axis not to load the whole data.
+    if block_size is None:
+        block_size = get_config('numpy', 'block_size')
+    shape = data.shape
+    if len(shape) == 0:
+        yield data[()]
         return
-    # other information
+    row_size = int(np.prod(shape[1:]))
+    rows = max(1, block_size//max(row_size, 1))
+    for i in range(0, shape[0], rows):
+        yield data[i:i+rows]
+
+
+def block_stats(data, std=False, percentile=False, block_size=None):
+    size = int(np.prod(data.shape))
+    if percentile:
+        sample_size = get_config('numpy', 'sample_size')
+        sample_step = max(1, size//sample_size)
+    else:
+        sample_step = 0
+    stats = BlockStats(std, sample_step)
+    for block in iter_blocks(data, block_size):
+        stats.update(block)
+    return stats
+
+
+def calc_numpy(data, stats):
+    # return BlockStats, message string, or None (nothing to show).
+    if np.prod(data.shape) == 0:
+        return '  empty data.'
+    if len(stats) == 0:
+        # do not touch the data.
+        return None
     try:
-        if np.any(np.isnan(data)):
-            # including np.nan
-            try:
-                d_mean = np.nanmean(data)
-            except Exception as e:
-                d_mean = '{}: {}'.format(str(type(e)).split("'")[1], e)
-            try:
-                d_max = np.nanmax(data)
-            except Exception as e:
-                d_max = '{}: {}'.format(str(type(e)).split("'")[1], e)
-            try:
-                d_min = np.nanmin(data)
-            except Exception as e:
-                d_min = '{}: {}'.format(str(type(e)).split("'")[1], e)
-            try:
-                nan_rate = np.sum(np.isnan(data))/np.prod(data.shape)
-            except Exception as e:
-                nan_rate = '{}: {}'.format(str(type(e)).split("'")[1], e)
-            prt_str = '''mean     : {}
-max      : {}
-min      : {}
-nan rate : {:.1f}%'''.format(d_mean, d_max, d_min, 100*nan_rate)
-        else:
-            # normal data
-            try:
-                d_mean = np.mean(data)
-            except Exception as e:
-                d_mean = '{}: {}'.format(str(type(e)).split("'")[1], e)
-            try:
-                d_max = np.max(data)
-            except Exception as e:
-                d_max = '{}: {}'.format(str(type(e)).split("'")[1], e)
-            try:
-                d_min = np.min(data)
-            except Exception as e:
-                d_min = '{}: {}'.format(str(type(e)).split("'")[1], e)
-            prt_str = '''mean     : {}
-max      : {}
-min      : {}'''.format(d_mean, d_max, d_min)
+        return block_stats(data, std='std' in stats,
+                           percentile='percentiles' in stats)
     except TypeError:
         # string list or something
-        prt_str = 'not a array of number'
-    print(prt_str)
+        return 'not a array of number'
+
+
+def print_stats(res, stats):
+    if res is None:
+        return
+    if type(res) is str:
+        print(res)
+        return
+    percentiles = get_config('numpy', 'percentiles')
+    if res.count == 0:
+        # all items are NaN.
+        vals = {'mean': np.nan, 'max': np.nan, 'min': np.nan, 'std': np.nan}
+    else:
+        vals = {'mean': res.mean, 'max': res.max, 'min': res.min,
+                'std': res.std}
+    for name, val in vals.items():
+        if name in stats:
+            print('{:9s}: {}'.format(name, val))
+    if 'percentiles' in stats:
+        for q in percentiles:
+            try:
+                val = res.percentile(q)
+            except Exception as e:
+                val = '{}: {}'.format(str(type(e)).split("'")[1], e)
+            print('{:9s}: {}'.format(f'{q:g}%', val))
+        if res.sample_step > 1:
+            print(f'  percentiles are estimated from every'
+                  f' {res.sample_step} items.')
+    if res.nan != 0 and 'nan_rate' in stats:
+        print('nan rate : {:.1f}%'.format(100*res.nan_rate))
+
+
+def show_numpy(data, stats=None, header=True):
+    if stats is None:
+        stats = get_config('numpy', 'stats')
+    if header:
+        show_header(data.dtype, data.shape)
+    print_stats(calc_numpy(data, stats), stats)
+
+
+def calc_member(fpath, key, stats):
+    # this function is called in the child processes.
+    with np.load(fpath, allow_pickle=False) as npz:
+        data = npz[key]
+    return data.dtype, data.shape, calc_numpy(data, stats)
+
+
+def show_members(fpath, keys, jobs):
+    # decompress and reduce npz members in parallel,
+    # and show the results in the order of keys.
+    stats = get_config('numpy', 'stats')
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=ctx) as executor:
+        futures = [executor.submit(calc_member, fpath, k, stats)
+                   for k in keys]
+        for k, future in zip(keys, futures):
+            dtype, shape, res = future.result()
+            print('\n{}'.format(k))
+            show_header(dtype, shape)
+            print_stats(res, stats)
+            sys.stdout.flush()
 
 
 def add_args(parser):
+    parser.add_argument('--summary',
+                        help='show only the type and shape of the data.'
+                        ' The data are not loaded.',
+                        action='store_true')
+    parser.add_argument('--jobs', help='number of processes to calculate'
+                        ' the statistics of npz members.',
+                        type=int, metavar='N', default=1)
     add_args_specification(parser, verbose=True, key=True,
                            interactive=False, cui=False)
 
 
 def show_help():
     helpmsg = help_template('numpy', 'show the contents of a NumPy-compressed file.' +
-                            ' If the file is "npz", you can specify the key name.',
+                            ' If the file is "npz", you can specify the key name.' +
+                            ' "npy" files are opened with memory-map.',
                             add_args)
     print(helpmsg)
 
 
 def main(fpath, args):
-    data = np.load(fpath, allow_pickle=False)
+    if not zipfile.is_zipfile(fpath):
+        # .npy file; show the header before touching the data.
+        with open(fpath, 'rb') as f:
+            header = read_header(f)
+        if header is not None and \
+           not args_chk(args, 'verbose') and not args_chk(args, 'key'):
+            shape, fortran_order, dtype = header
+            show_header(dtype, shape, fortran_order)
+            if args.summary:
+                return
+            sys.stdout.flush()
+            data = np.load(fpath, mmap_mode='r', allow_pickle=False)
+            show_numpy(data, header=False)
+            return
+    data = np.load(fpath, mmap_mode='r', allow_pickle=False)
+    if type(data) is NpzFile:
+        data = NpzCache(data)
     if args_chk(args, 'verbose'):
-        if type(data) is NpzFile:
+        if type(data) is NpzCache:
             for k in data:
                 print_key(k)
                 print(data[k])
         else:
             print(data)
     elif args_chk(args, 'key'):
-        if type(data) is NpzFile:
+        if type(data) is NpzCache:
             if len(args.key) == 0:
                 for k in data:
                     print(k)
@@ -94,9 +355,17 @@ def main(fpath, args):
                 show_numpy(data[k])
                 print()
     else:
-        if type(data) is NpzFile:
+        if type(data) is NpzCache and not args.summary and args.jobs > 1:
+            show_members(fpath, list(data.keys()), args.jobs)
+        elif type(data) is NpzCache:
             for k in data:
                 print('\n{}'.format(k))
-                show_numpy(data[k])
+                if args.summary:
+                    shape, fortran_order, dtype = data.header(k)
+                    show_header(dtype, shape, fortran_order)
+                else:
+                    show_numpy(data[k])
+        elif args.summary:
+            show_header(data.dtype, data.shape)
         else:
             show_numpy(data)
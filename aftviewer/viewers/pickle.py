@@ -1,13 +1,15 @@
 import pickle
+import pickletools
 import os
 import pprint
+from collections import OrderedDict
 from pathlib import PurePath
 from functools import partial
 from logging import getLogger
 
 from .. import (GLOBAL_CONF, args_chk, print_key, get_config, print_error,
                 interactive_view, interactive_cui, help_template,
-                add_args_specification, add_args_encoding
+                add_args_specification, add_args_encoding, limited_pformat
                 )
 from .. import ReturnMessage as RM
 
@@ -29,18 +31,69 @@ def show_keys(data, key):
             print(k)
 
 
+class KeyIndex():
+    """
+    index of a dict node; the map from str(key) to the original key,
+    and sorted names of the children.
+    """
+    __slots__ = ('node', 'keys', 'dirs', 'files')
+
+    def __init__(self, node: dict):
+        self.node = node
+        self.keys = {}
+        self.dirs = []
+        self.files = []
+        for k, v in node.items():
+            sk = str(k)
+            # the first key wins when some keys have the same str.
+            self.keys.setdefault(sk, k)
+            if isinstance(v, dict):
+                self.dirs.append(sk)
+            else:
+                self.files.append(sk)
+        self.dirs.sort()
+        self.files.sort()
+
+
+# LRU cache of KeyIndex, id(node) -> KeyIndex.
+# The total number of cached keys is bounded by pickle.index_cache_keys.
+index_cache: OrderedDict = OrderedDict()
+index_cache_keys = 0
+
+
+def get_index(node):
+    global index_cache_keys
+    nid = id(node)
+    if nid in index_cache:
+        index = index_cache[nid]
+        # the cached index keeps a reference to the node,
+        # so the id is not reused while it is cached.
+        if index.node is node:
+            index_cache.move_to_end(nid)
+            return index
+        del index_cache[nid]
+        index_cache_keys -= len(index.keys)
+    index = KeyIndex(node)
+    index_cache[nid] = index
+    index_cache_keys += len(index.keys)
+    max_keys = get_config('pickle', 'index_cache_keys')
+    while index_cache_keys > max_keys and len(index_cache) > 1:
+        _, old = index_cache.popitem(last=False)
+        index_cache_keys -= len(old.keys)
+    return index
+
+
 def get_item(data, cpath):
     tmp_data = data
     for k in PurePath(cpath).parts:
-        tmp_data_update = False
-        for key in tmp_data.keys():
-            if str(key) == k:
-                tmp_data = tmp_data[key]
-                tmp_data_update = True
-                break
-        if not tmp_data_update:
+        if not isinstance(tmp_data, dict):
+            logger.error(f'not a dict: {cpath}, {k}')
+            return None
+        keys = get_index(tmp_data).keys
+        if k not in keys:
             logger.error(f'key not found: {cpath}, {k}')
             return None
+        tmp_data = tmp_data[keys[k]]
     return tmp_data
 
 
@@ -48,29 +101,255 @@ def show_func(data, cpath, **kwargs):
     tmp_data = get_item(data, cpath)
     if tmp_data is None:
         return RM(f'warning! no key {cpath} or the value is None', False)
-    res = pprint.pformat(tmp_data, **pargs)
+    res = limited_pformat(tmp_data, **pargs)
     return RM(res, False)
 
 
 def get_contents(data, path):
-    dirs = []
-    files = []
     tmp_data = get_item(data, path)
-    if tmp_data is None:
+    if not isinstance(tmp_data, dict):
         return [], []
-    if isinstance(tmp_data, dict):
-        for k in tmp_data.keys():
-            if isinstance(tmp_data[k], dict):
-                dirs.append(str(k))
+    index = get_index(tmp_data)
+    return index.dirs.copy(), index.files.copy()
+
+
+class Node():
+    """
+    placeholder of an object in the opcode stream.
+    size is the number of items of containers (None if unknown).
+    items is the list of (key, value) of the root object,
+    and args is the items of short tuples.
+    """
+    __slots__ = ('type', 'size', 'items', 'args')
+
+    def __init__(self, type_name, size=None, items=None):
+        self.type = type_name
+        self.size = size
+        self.items = items
+        self.args = None
+
+    def __str__(self):
+        if self.size is None:
+            return self.type
+        return f'{self.type} ({self.size} items)'
+
+
+class Global():
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+
+# long strings/bytes are replaced by a Node to keep the memory small.
+max_str_len = 256
+stack_ops = {
+    # opcode name: (type name, number of popped items)
+    'EMPTY_DICT': ('dict', 0), 'EMPTY_LIST': ('list', 0),
+    'EMPTY_TUPLE': ('tuple', 0), 'EMPTY_SET': ('set', 0),
+    'TUPLE1': ('tuple', 1), 'TUPLE2': ('tuple', 2), 'TUPLE3': ('tuple', 3),
+}
+mark_ops = {
+    'DICT': 'dict', 'LIST': 'list', 'TUPLE': 'tuple', 'FROZENSET': 'frozenset',
+}
+const_ops = {
+    'INT', 'BININT', 'BININT1', 'BININT2', 'LONG', 'LONG1', 'LONG4',
+    'FLOAT', 'BINFLOAT', 'STRING', 'BINSTRING', 'SHORT_BINSTRING',
+    'UNICODE', 'BINUNICODE', 'SHORT_BINUNICODE', 'BINUNICODE8',
+    'BINBYTES', 'SHORT_BINBYTES', 'BINBYTES8', 'BYTEARRAY8',
+}
+
+
+def describe(obj):
+    if isinstance(obj, (Node, Global)):
+        return str(obj) if isinstance(obj, Node) else f'global {obj.name}'
+    elif isinstance(obj, str):
+        return f'str ({len(obj)} chars)'
+    elif isinstance(obj, (bytes, bytearray)):
+        return f'{type(obj).__name__} ({len(obj)} bytes)'
+    else:
+        return type(obj).__name__
+
+
+def get_class_name(func, args):
+    # type name of the object created by REDUCE or NEWOBJ.
+    if not isinstance(func, Global):
+        return 'object'
+    if func.name in ('copyreg._reconstructor',
+                     'copy_reg._reconstructor') and \
+       isinstance(args, Node) and args.args and \
+       isinstance(args.args[0], Global):
+        return args.args[0].name
+    return func.name
+
+
+def scan_structure(fp):
+    """
+    scan the opcode stream of the pickle file without unpickling it.
+    Nothing is constructed and no callable is executed;
+    containers and objects are replaced by Node.
+
+    Parameters
+    ----------
+    fp: file object
+        binary file object of the pickle file.
+
+    Returns
+    -------
+    Node or object
+        the root object. If it is a dict, (key, value) pairs are stored
+        in "items" attribute.
+    """
+    stack = []
+    memo = {}
+    mark = object()
+
+    def pop_mark():
+        for i in range(len(stack)-1, -1, -1):
+            if stack[i] is mark:
+                items = stack[i+1:]
+                del stack[i:]
+                return items
+        raise ValueError('mark not found')
+
+    def new_node(type_name, size, items=None):
+        # keep items only for the root object.
+        if len(stack) == 0:
+            items = [] if items is None else items
+        else:
+            items = None
+        return Node(type_name, size, items)
+
+    def add_items(node, items, pairs=False):
+        # items are added to the list, set, or dict.
+        if isinstance(node, Node):
+            node.size = (node.size or 0) + len(items)
+            if pairs and node.items is not None:
+                node.items += items
+
+    for opcode, arg, pos in pickletools.genops(fp):
+        name = opcode.name
+        if name == 'STOP':
+            break
+        elif name in ('PROTO', 'FRAME', 'READONLY_BUFFER'):
+            pass
+        elif name == 'MARK':
+            stack.append(mark)
+        elif name == 'POP':
+            stack.pop()
+        elif name == 'POP_MARK':
+            pop_mark()
+        elif name == 'DUP':
+            stack.append(stack[-1])
+        elif name in ('NONE', 'NEWTRUE', 'NEWFALSE'):
+            stack.append({'NONE': None, 'NEWTRUE': True,
+                          'NEWFALSE': False}[name])
+        elif name in stack_ops:
+            type_name, num = stack_ops[name]
+            items = stack[len(stack)-num:]
+            del stack[len(stack)-num:]
+            node = new_node(type_name, num)
+            if type_name == 'tuple':
+                # used to get the class name of copyreg._reconstructor.
+                node.args = items
+            stack.append(node)
+        elif name in mark_ops:
+            items = pop_mark()
+            if name == 'DICT':
+                pairs = list(zip(items[::2], items[1::2]))
+                node = new_node('dict', len(pairs), pairs)
             else:
-                files.append(str(k))
-    dirs.sort()
-    files.sort()
-    return dirs, files
+                node = new_node(mark_ops[name], len(items))
+                if name == 'TUPLE' and len(items) <= 3:
+                    node.args = items
+            stack.append(node)
+        elif name == 'APPEND':
+            value = stack.pop()
+            add_items(stack[-1], [value])
+        elif name in ('APPENDS', 'ADDITEMS'):
+            items = pop_mark()
+            add_items(stack[-1], items)
+        elif name == 'SETITEM':
+            value = stack.pop()
+            key = stack.pop()
+            add_items(stack[-1], [(key, value)], True)
+        elif name == 'SETITEMS':
+            items = pop_mark()
+            add_items(stack[-1], list(zip(items[::2], items[1::2])), True)
+        elif name == 'BUILD':
+            stack.pop()
+        elif name == 'GLOBAL':
+            stack.append(Global(arg.replace(' ', '.')))
+        elif name == 'STACK_GLOBAL':
+            qualname = stack.pop()
+            module = stack.pop()
+            stack.append(Global(f'{module}.{qualname}'))
+        elif name == 'REDUCE':
+            args = stack.pop()
+            func = stack.pop()
+            type_name = get_class_name(func, args)
+            stack.append(new_node(type_name, None))
+        elif name == 'NEWOBJ':
+            stack.pop()
+            cls = stack.pop()
+            stack.append(new_node(get_class_name(cls, None), None))
+        elif name == 'NEWOBJ_EX':
+            stack.pop()
+            stack.pop()
+            cls = stack.pop()
+            stack.append(new_node(get_class_name(cls, None), None))
+        elif name == 'OBJ':
+            items = pop_mark()
+            stack.append(new_node(get_class_name(items[0], None), None))
+        elif name == 'INST':
+            pop_mark()
+            stack.append(new_node(arg.replace(' ', '.'), None))
+        elif name in ('PUT', 'BINPUT', 'LONG_BINPUT'):
+            memo[arg] = stack[-1]
+        elif name == 'MEMOIZE':
+            memo[len(memo)] = stack[-1]
+        elif name in ('GET', 'BINGET', 'LONG_BINGET'):
+            stack.append(memo[arg])
+        elif name in const_ops:
+            if isinstance(arg, (str, bytes, bytearray)) and \
+               len(arg) > max_str_len:
+                stack.append(Node(describe(arg)))
+            else:
+                stack.append(arg)
+        else:
+            # other opcodes (persistent id, extension, buffer, ...)
+            if pickletools.markobject in opcode.stack_before:
+                pop_mark()
+            else:
+                del stack[len(stack)-len(opcode.stack_before):]
+            for _ in opcode.stack_after:
+                stack.append(Node(name.lower()))
+    if len(stack) != 1:
+        raise ValueError('invalid pickle stream')
+    return stack[0]
+
+
+def show_structure(fpath):
+    with open(fpath, 'rb') as f:
+        try:
+            root = scan_structure(f)
+        except Exception as e:
+            print_error(f'failed to scan the pickle file: {e}')
+            return
+    print(describe(root))
+    if isinstance(root, Node) and root.items is not None:
+        for k, v in root.items:
+            key = str(k) if isinstance(k, (Node, Global)) else repr(k)
+            print(f'  {key}: {describe(v)}')
 
 
 def add_args(parser):
     add_args_encoding(parser)
+    parser.add_argument('--structure',
+                        help='show only the type and size of the top-level'
+                        ' items. The file is scanned without unpickling,'
+                        ' so no object is constructed.',
+                        action='store_true')
     add_args_specification(parser, verbose=True, key=True,
                            interactive=True, cui=True)
 
@@ -88,6 +367,9 @@ def main(fpath, args):
     else:
         encoding = get_config('pickle', 'encoding')
     logger.info(f'encoding: {encoding}')
+    if args.structure:
+        show_structure(fpath)
+        return
     with open(fpath, 'rb') as f:
         data = pickle.load(f, encoding=encoding)
     fname = os.path.basename(fpath)
@@ -1,5 +1,9 @@
 import os
+import sys
+import csv
+import time
 import sqlite3
+from itertools import chain
 from functools import partial
 from pathlib import PurePosixPath
 from logging import getLogger
@@ -11,12 +15,12 @@ else:
     import_curses = True
 
 from .. import (GLOBAL_CONF, args_chk, print_key, cprint, print_error,
-                interactive_view, get_config,
+                interactive_view, get_config, ContentsCache,
                 help_template, add_args_specification, add_args_output
                 )
 from .. import ReturnMessage as RM
 from pymeflib.tree2 import branch_str, TreeViewer
-from ..core.cui import CursesCUI
+from ..core.cui import CursesCUI, LazyLines
 try:
     from tabulate import tabulate
 except ImportError:
@@ -25,13 +29,157 @@ except ImportError:
 else:
     is_tabulate = True
 sel_items = ''
+# the first row shown in the CUI main window.
+base_offset = 0
+page_offset = 0
+# the maximum number of rows shown in the CUI (--limit).
+row_limit = None
 logger = getLogger(GLOBAL_CONF.logname)
 
 
-def show_table(cursor, tables, table_path,
-               verbose=True, output=None, **kwargs):
+def get_rows(cursor, size):
+    # read the selected rows by chunks not to load the whole table.
+    while True:
+        rows = cursor.fetchmany(size)
+        if len(rows) == 0:
+            break
+        yield rows
+
+
+def write_csv(f, batches, headers):
+    # write rows as soon as each chunk is read.
+    writer = csv.writer(f, lineterminator='\n')
+    writer.writerow(headers)
+    nrows = 0
+    for rows in batches:
+        writer.writerows(rows)
+        nrows += len(rows)
+    return nrows
+
+
+def is_number(val):
+    if type(val) is bool:
+        return False
+    elif isinstance(val, (int, float)):
+        return True
+    elif isinstance(val, str):
+        try:
+            float(val)
+        except ValueError:
+            return False
+        return True
+    else:
+        return False
+
+
+def afterpoint(string):
+    # number of characters after the decimal point (or the exponent),
+    # -1 for integers and non-numbers.
+    if not is_number(string) or string.lstrip('+-').isdigit():
+        return -1
+    pos = string.rfind('.')
+    if pos < 0:
+        pos = string.lower().rfind('e')
+    if pos < 0:
+        return -1
+    return len(string)-pos-1
+
+
+def get_aligns(rows):
+    # same as tabulate, numbers are aligned at the decimal points,
+    # and the others are aligned to the left.
+    # returns the list of the maximum afterpoint of each numeric column,
+    # or None for the left aligned ones.
+    aligns = []
+    for col in zip(*rows):
+        vals = [v for v in col if v is not None]
+        if len(vals) != 0 and all(is_number(v) for v in vals):
+            aligns.append(max(afterpoint(format_cell(v)) for v in vals))
+        else:
+            aligns.append(None)
+    return aligns
+
+
+def format_cell(val):
+    if val is None:
+        return ''
+    elif type(val) is float:
+        return format(val, 'g')
+    else:
+        return str(val)
+
+
+def fit_cell(cell, width):
+    # cut a long value with "..." to keep the widths of the header.
+    if len(cell) <= width:
+        return cell
+    elif width <= 3:
+        return cell[:width]
+    else:
+        return cell[:width-3] + '...'
+
+
+def format_rows(rows, headers, first, widths, aligns):
     shift = '  '
     res = []
+    if is_tabulate and first:
+        table_str = tabulate(rows, headers, tablefmt='orgtbl')
+        lines = table_str.split('\n')
+        # the column widths are taken from the separator "|----+----|".
+        widths[:] = [len(c)-2 for c in lines[1][1:-1].split('+')]
+        aligns[:] = get_aligns(rows)
+        for line in lines:
+            res.append(shift + line)
+    elif is_tabulate:
+        # the rows of the later chunks follow the widths of the first one.
+        # longer values are cut not to break the table.
+        for itms in rows:
+            cells = []
+            for itm, width, decimals in zip(itms, widths, aligns):
+                cell = format_cell(itm).replace('\n', ' ')
+                if decimals is None:
+                    cells.append(fit_cell(cell, width).ljust(width))
+                else:
+                    padded = cell + ' '*(decimals-afterpoint(cell))
+                    if len(padded) <= width:
+                        cell = padded
+                    cells.append(fit_cell(cell, width).rjust(width))
+            res.append(shift + '| ' + ' | '.join(cells) + ' |')
+    else:
+        if first:
+            tmp_res = ''
+            tmp_res += shift+'|'
+            for hd in headers:
+                tmp_res += ' {} |'.format(hd)
+            res.append(tmp_res)
+        for itms in rows:
+            tmp_res = ''
+            tmp_res += shift+'|'
+            for itm in itms:
+                tmp_res += ' {} |'.format(itm)
+            res.append(tmp_res)
+    return res
+
+
+def table_lines(batches, headers):
+    # the headers are shown only once. With tabulate, the column widths and
+    # alignments are fixed by the first chunk (sqlite3.fetch_size rows).
+    # A longer value in the later chunks is cut and ends with "...".
+    first = True
+    widths = []
+    aligns = []
+    for rows in batches:
+        yield from format_rows(rows, headers, first, widths, aligns)
+        first = False
+    if first:
+        # empty table
+        yield from format_rows([], headers, first, widths, aligns)
+
+
+def show_table(cursor, tables, table_path,
+               verbose=True, output=None, limit=None, offset=0,
+               stream=None, **kwargs):
+    res = []
     is_csv = (type(output) is str) and output.endswith('csv')
     if '/' in table_path:
         table, column = table_path.split('/')
@@ -60,53 +208,62 @@ def show_table(cursor, tables, table_path,
             else:
                 ctype = tinfo[2]
             res.append('{}{} [ {} ]'.format(branch_str, tinfo[1], ctype))
-
-    else:
-        if column is None:
-            headers = []
-            for tinfo in table_info:
-                headers.append(tinfo[1])
-            cursor.execute('select * from {}'.format(table))
-        else:
-            headers = column.split(',')
-            try:
-                cursor.execute('select {} from {}'.format(column, table))
-            except sqlite3.OperationalError:
-                return RM('Incorrect columns: {}'.format(column), True)
-        columns = cursor.fetchall()
-        table_items = []
-        for col in columns:
-            table_items.append([])
-            for item in col:
-                table_items[-1].append(item)
-
-        if is_csv:
-            res.append(','.join(headers))
-            for itms in table_items:
-                res.append(','.join([str(x) for x in itms]))
-        elif is_tabulate:
-            table_str = tabulate(table_items, headers, tablefmt='orgtbl')
-            table_str = table_str.replace('\n', '\n'+shift)
-            res.append(shift + table_str)
-        else:
-            tmp_res = ''
-            tmp_res += shift+'|'
-            for hd in headers:
-                tmp_res += ' {} |'.format(hd)
-            res.append(tmp_res)
-            for itms in table_items:
-                tmp_res = ''
-                tmp_res += shift+'|'
-                for itm in itms:
-                    tmp_res += ' {} |'.format(itm)
-                res.append(tmp_res)
-    if output is None or not verbose:
         return RM('\n'.join(res), False)
+
+    fetch_size = get_config('sqlite3', 'fetch_size')
+    if output is None and stream is None:
+        # the rows are read lazily while the message is shown.
+        # The shared cursor is used by other functions in the meantime,
+        # so a dedicated cursor is used.
+        cursor = cursor.connection.cursor()
+    if column is None:
+        headers = []
+        for tinfo in table_info:
+            headers.append(tinfo[1])
+        column = '*'
     else:
+        headers = column.split(',')
+    query = 'select {} from {}'.format(column, table)
+    if limit is not None or offset != 0:
+        # limit -1 means no limit.
+        query += ' limit {:d} offset {:d}'.format(
+            -1 if limit is None else limit, offset)
+    logger.debug(f'query: {query}')
+    try:
+        cursor.execute(query)
+    except sqlite3.OperationalError:
+        return RM('Incorrect columns: {}'.format(column), True)
+    batches = get_rows(cursor, fetch_size)
+
+    if is_csv:
+        stime = time.perf_counter()
+        with open(output, 'a', newline='') as f:
+            for line in res:
+                f.write(line+'\n')
+            nrows = write_csv(f, batches, headers)
+            f.write('\n')
+        etime = time.perf_counter()-stime
+        rate = nrows/etime if etime > 0 else 0.0
+        logger.info(f'{nrows} rows in {etime:.2f} sec')
+        return RM(f'{table_path} is saved ({nrows} rows, {rate:.0f} rows/s)',
+                  False)
+    elif output is not None:
         with open(output, 'a') as f:
-            f.write('\n'.join(res))
-            f.write('\n\n')
+            for line in res:
+                f.write(line+'\n')
+            for line in table_lines(batches, headers):
+                f.write(line+'\n')
+            f.write('\n')
         return RM(f'{table_path} is saved', False)
+    elif stream is not None:
+        for line in res:
+            stream.write(line+'\n')
+        for line in table_lines(batches, headers):
+            stream.write(line+'\n')
+        stream.flush()
+        return RM('', False)
+    else:
+        return RM(chain(res, table_lines(batches, headers)), False)
 
 
 def get_contents_i(cursor, tables, path):
@@ -137,15 +294,15 @@ def add_col(selected_contents: str):
 
 def add_contents(curs: CursesCUI):
     # wrapper of core.cui.CursesCUI.select_item
-    global sel_items
+    global sel_items, page_offset
     curs.selected = curs.sidebar.contents[curs.sidebar.idx]
     curs.search.is_word = None
-    if curs.selected in curs.dirs:
+    if curs.sidebar.contents.is_dir(curs.sidebar.idx):
         if curs.search.is_file:
             curs.cpath = curs.purepath(curs.selected)
         else:
             curs.cpath = curs.cpath/curs.selected
-        curs.dirs, curs.files = curs.tv.get_contents(curs.cpath)
+        curs.dirs, curs.files = curs.get_contents(curs.cpath)
         curs.search.is_file = False
         curs.init_var()
     else:
@@ -164,14 +321,67 @@ def add_contents(curs: CursesCUI):
                 sel_items = str(curs.cpath/curs.selected)
             fpath = sel_items
         logger.info(f'set {fpath}')
-        curs.mainwin.ud = 0
-        curs.mainwin.lr = 0
-        # message of waiting for opening an item
-        curs.message = ['opening an item...']
-        curs.mainwin.update()
-        curs.info = curs.show_func(fpath, cui=True)
-        curs.message = curs.info.message.split("\n")
-        curs.message = [ln.replace("\t", "  ") for ln in curs.message]
+        page_offset = base_offset
+        open_table(curs, fpath)
+
+
+def open_table(curs: CursesCUI, fpath: str, note=None):
+    curs.mainwin.ud = 0
+    curs.mainwin.lr = 0
+    # message of waiting for opening an item
+    curs.message = ['opening an item...']
+    curs.mainwin.update()
+    # one page has sqlite3.fetch_size rows.
+    limit = get_config('sqlite3', 'fetch_size')
+    if row_limit is not None:
+        limit = min(limit, base_offset+row_limit-page_offset)
+    with curs.lock:
+        curs.info = curs.show_func(fpath, cui=True, offset=page_offset,
+                                   limit=limit)
+    if note is None:
+        curs.message = LazyLines(curs.info.message)
+    else:
+        # show the note above the table.
+        message = curs.info.message
+        if isinstance(message, str):
+            message = message.split('\n')
+        curs.message = LazyLines(chain([note, ''], message))
+
+
+def has_rows(curs: CursesCUI, cursor, offset: int) -> bool:
+    table = sel_items.split('/')[0]
+    with curs.lock:
+        cursor.execute('select 1 from {} limit 1 offset {:d}'.format(
+            table, offset))
+        return cursor.fetchone() is not None
+
+
+def next_page(curs: CursesCUI, cursor):
+    global page_offset
+    if len(sel_items) == 0:
+        return
+    fetch_size = get_config('sqlite3', 'fetch_size')
+    if row_limit is not None and \
+       page_offset+fetch_size >= base_offset+row_limit:
+        is_end = True
+    else:
+        is_end = not has_rows(curs, cursor, page_offset+fetch_size)
+    if is_end:
+        # stay on the last page.
+        open_table(curs, sel_items, note='no more rows.')
+        return
+    page_offset += fetch_size
+    open_table(curs, sel_items)
+
+
+def pre_page(curs: CursesCUI):
+    global page_offset
+    if len(sel_items) == 0:
+        return
+    page_offset -= get_config('sqlite3', 'fetch_size')
+    if page_offset < base_offset:
+        page_offset = base_offset
+    open_table(curs, sel_items)
 
 
 def clear_items(curs: CursesCUI):
@@ -208,6 +418,10 @@ def init_outfile(output):
 
 def add_args(parser):
     add_args_output(parser)
+    parser.add_argument('--limit', help='maximum number of rows to show.',
+                        type=int)
+    parser.add_argument('--offset', help='number of rows to skip.',
+                        type=int, default=0)
     add_args_specification(parser, verbose=True, key=True,
                            interactive=True, cui=True)
 
@@ -219,12 +433,21 @@ def show_help():
                             'NOTE: --output is supported when --verbose or '
                             '--key is specified. '
                             'If extension of the output file is".csv",'
-                            'it is saved as the CSV file.',
+                            'it is saved as the CSV file. '
+                            'Rows are read by chunks of sqlite3.fetch_size, '
+                            'the column widths are fixed by the first chunk, '
+                            'and longer values are cut with "...". '
+                            '--limit and --offset specify the range of '
+                            'rows. '
+                            'In the CUI mode, "]" and "[" show the next and '
+                            'previous pages of the table, and each page has '
+                            'sqlite3.fetch_size rows.',
                             add_args)
     print(helpmsg)
 
 
 def main(fpath, args):
+    global base_offset, page_offset, row_limit
     database = sqlite3.connect(fpath)
     cursor = database.cursor()
     cursor.execute("select name from sqlite_master where type='table'")
@@ -233,13 +456,16 @@ def main(fpath, args):
 
     if args_chk(args, 'interactive'):
         gc = partial(get_contents_i, cursor, tables)
-        interactive_view(fname, gc, partial(show_table, cursor, tables))
+        interactive_view(fname, gc, partial(show_table, cursor, tables,
+                                            limit=args.limit,
+                                            offset=args.offset))
     elif args_chk(args, 'cui'):
         # interactive_cui(fname, gc, partial(show_table, cursor, tables))
         if not import_curses:
             print('failed to import curses.')
             return
-        gc = partial(get_contents_c, cursor, tables)
+        gc = ContentsCache(fpath, 'sqlite3',
+                           partial(get_contents_c, cursor, tables))
         tv = TreeViewer('.', gc, purepath=PurePosixPath, logger=logger)
         curses_cui = CursesCUI()
         curses_cui.add_key_maps('\n', [add_contents, [curses_cui], '<CR>',
@@ -251,17 +477,29 @@ def main(fpath, args):
                                            'go up the path or quit'
                                            ' the search mode',
                                            True, True, True])
+        curses_cui.add_key_maps(']', [next_page, [curses_cui, cursor], ']',
+                                      'show the next page of the table',
+                                      True, False, False])
+        curses_cui.add_key_maps('[', [pre_page, [curses_cui], '[',
+                                      'show the previous page of the table',
+                                      True, False, False])
         curses_cui.get_title = get_db_title
         curses_cui.add_key_maps('KEY_SUP', [clear_items, [curses_cui],
                                             '', '', True, True, True])
         curses_cui.disable_stream_handler()
         curses_cui.wrap = False
+        # items are opened by add_contents, so prefetch is not used.
+        curses_cui.prefetch = 0
+        base_offset = args.offset
+        page_offset = args.offset
+        row_limit = args.limit
         try:
             curses.wrapper(curses_cui.main, fname,
                            partial(show_table, cursor, tables),
                            PurePosixPath('.'), tv)
         except AssertionError as e:
             print(e)
+        gc.save()
     elif args_chk(args, 'key'):
         if len(args.key) == 0:
             for t in tables:
@@ -273,9 +511,11 @@ def main(fpath, args):
         for k in args.key:
             print_key(k)
             info = show_table(cursor, tables, k, verbose=True,
-                              output=args.output)
+                              output=args.output, limit=args.limit,
+                              offset=args.offset, stream=sys.stdout)
             if not info.error:
-                print(info.message)
+                if len(info.message) != 0:
+                    print(info.message)
                 print()
             else:
                 print_error(info.message)
@@ -286,6 +526,8 @@ def main(fpath, args):
                 return
         for table in tables:
             info = show_table(cursor, tables, table, verbose=args.verbose,
-                              output=args.output)
+                              output=args.output, limit=args.limit,
+                              offset=args.offset, stream=sys.stdout)
             if not info.error:
-                print(info.message)
+                if len(info.message) != 0:
+                    print(info.message)
@@ -1,48 +1,80 @@
 import os
 import tarfile
 import tempfile
+import threading
 from functools import partial
 from pathlib import Path, PurePosixPath
 from logging import getLogger
-from typing import Optional
+from typing import Optional, Dict, Tuple
 
 from .. import (GLOBAL_CONF, Args, args_chk, print_key, print_error,
-                is_image, interactive_view, interactive_cui,
+                is_image, interactive_view, interactive_cui, ContentsCache,
                 show_image_file, run_system_cmd, help_template,
                 add_args_imageviewer, add_args_output, add_args_specification
                 )
 from .. import ReturnMessage as RM
+from ..core.tree_index import Tree, split_name, build_index
 from pymeflib.tree2 import GC, branch_str, show_tree
 logger = getLogger(GLOBAL_CONF.logname)
 
 
-def show_tar(tar_file: tarfile.TarFile,
+# member name -> TarInfo
+TarMembers = Dict[str, tarfile.TarInfo]
+
+
+class TarIndex():
+    """
+    tree and members of a tar file, which are built at the first access.
+    The index is not built if all contents are read from the disk cache.
+    """
+    __slots__ = ('tar_file', 'index', 'lock')
+
+    def __init__(self, tar_file: tarfile.TarFile):
+        self.tar_file = tar_file
+        self.index: Optional[Tuple[Tree, TarMembers]] = None
+        self.lock = threading.Lock()
+
+    def get(self) -> Tuple[Tree, TarMembers]:
+        with self.lock:
+            if self.index is None:
+                self.index = build_index(self.tar_file.getmembers(),
+                                         lambda t: t.name,
+                                         tarfile.TarInfo.isdir,
+                                         tarfile.TarInfo.isfile)
+            return self.index
+
+    @property
+    def tree(self) -> Tree:
+        return self.get()[0]
+
+    @property
+    def members(self) -> TarMembers:
+        return self.get()[1]
+
+
+def show_tar(tar_file: tarfile.TarFile, index: TarIndex,
              tmpdir: Optional[tempfile.TemporaryDirectory],
              args: Args, get_contents: GC, cpath: str, **kwargs):
     res = []
+    members = index.members
     # check cpath
-    try:
-        if cpath.endswith('/'):
-            key_name = cpath[:-1]
-        else:
-            key_name = cpath
-        tarinfo = tar_file.getmember(key_name)
-    except KeyError as e:
-        logger.error(f'failed to open [{cpath}]: {e}')
+    key_name = '/'.join(split_name(cpath))
+    if key_name not in members:
+        logger.error(f'failed to open [{cpath}]: not found in the archive')
         return RM(f'Error!! Cannot open {cpath}.', True)
+    tarinfo = members[key_name]
 
     if args_chk(args, 'output') and args_chk(args, 'key'):
         outpath = Path(args.output)
         logger.info(f'out key: {cpath}')
         if not outpath.parent.is_dir():
             outpath.parent.mkdir(parents=True)
-        for item in tar_file.getmembers():
-            logger.debug(f'checking;; {item.name}')
-            if cpath == item.name:
-                logger.info(f'  find1; {item.name}')
+        for name, item in members.items():
+            if key_name == name:
+                logger.info(f'  find1; {name}')
                 tar_file.extract(item, path=outpath)
-            elif cpath in [str(x) for x in PurePosixPath(item.name).parents]:
-                logger.info(f'  find2; {item.name}')
+            elif name.startswith(f'{key_name}/'):
+                logger.info(f'  find2; {name}')
                 tar_file.extract(item, path=outpath)
         return RM(f'file is saved to {outpath/cpath}', False)
 
@@ -51,7 +83,7 @@ def show_tar(tar_file: tarfile.TarFile,
         # file
         if 'system' in kwargs and kwargs['system']:
             tar_file.extract(tarinfo, path=tmpdir.name)
-            tmpfile = os.path.join(tmpdir.name, cpath)
+            tmpfile = os.path.join(tmpdir.name, tarinfo.name)
             ret = run_system_cmd(tmpfile)
             if ret:
                 return RM('open {}'.format(cpath), False)
@@ -59,7 +91,7 @@ def show_tar(tar_file: tarfile.TarFile,
                 return RM('Failed to open {}.'.format(cpath), True)
         elif is_image(key_name):
             tar_file.extract(tarinfo, path=tmpdir.name)
-            tmpfile = os.path.join(tmpdir.name, cpath)
+            tmpfile = os.path.join(tmpdir.name, tarinfo.name)
             ret = show_image_file(tmpfile, args)
             if ret is None:
                 msg = 'image viewer not found.'
@@ -72,7 +104,7 @@ def show_tar(tar_file: tarfile.TarFile,
 
         else:
             # text file?
-            for line in tar_file.extractfile(key_name):
+            for line in tar_file.extractfile(tarinfo):
                 try:
                     res.append(line.decode().replace("\n", ''))
                 except UnicodeDecodeError as e:
@@ -93,35 +125,13 @@ def show_tar(tar_file: tarfile.TarFile,
     return RM('\n'.join(res), False)
 
 
-def get_contents(tar_file: tarfile.TarFile, path: PurePosixPath):
+def get_contents(index: TarIndex, path: PurePosixPath):
+    tree = index.tree
     cpath = str(path)
-    if cpath == '.':
-        lenpath = 0
-    else:
-        lenpath = len(cpath)+1
-    files = []
-    dirs = []
-    for t in tar_file.getmembers():
-        tpath = PurePosixPath(t.name)
-        if lenpath != 0:  # not root
-            if t.name == cpath:
-                continue
-            if path not in tpath.parents:
-                continue
-        tname = t.name[lenpath:]
-        if '/' in tname:
-            # @ root dir, count "directoly added"(?) files.
-            # in some case, directories are not listed?
-            tmp_dir = tname.split('/')[0]
-            if tmp_dir not in dirs:
-                dirs.append(tmp_dir)
-        elif t.isfile():
-            files.append(tname)
-        elif t.isdir():
-            dirs.append(tname)
-    dirs.sort()
-    files.sort()
-    return dirs, files
+    if cpath not in tree:
+        return [], []
+    dirs, files = tree[cpath]
+    return dirs.copy(), files.copy()
 
 
 def add_args(parser):
@@ -154,8 +164,9 @@ def main(fpath, args):
         tmpdir = None
         logger.debug('do not set tmp dir')
     fname = os.path.basename(fpath)
-    gc = partial(get_contents, tar_file)
-    sf = partial(show_tar, tar_file, tmpdir, args, gc)
+    index = TarIndex(tar_file)
+    gc = ContentsCache(fpath, 'tar', partial(get_contents, index))
+    sf = partial(show_tar, tar_file, index, tmpdir, args, gc)
 
     if args_chk(args, 'output'):
         if not args_chk(args, 'key') or len(args.key) == 0:
@@ -171,7 +182,7 @@ def main(fpath, args):
             tar_file.list(verbose=False)
         for k in args.key:
             print_key(k)
-            info = show_tar(tar_file, tmpdir, args, gc, k)
+            info = show_tar(tar_file, index, tmpdir, args, gc, k)
             if not info.error:
                 print(info.message)
                 print()
@@ -182,6 +193,7 @@ def main(fpath, args):
     else:
         show_tree(fname, gc, logger=logger, purepath=PurePosixPath)
 
+    gc.save()
     tar_file.close()
     if need_tmp:
         tmpdir.cleanup()
@@ -5,7 +5,7 @@ from functools import partial
 from getpass import getpass
 from pathlib import Path, PurePosixPath
 from logging import getLogger
-from typing import Optional
+from typing import Optional, Dict
 
 from .. import (GLOBAL_CONF, Args, args_chk, is_image, print_key, print_error,
                 interactive_view, interactive_cui, show_image_file,
@@ -13,6 +13,7 @@ from .. import (GLOBAL_CONF, Args, args_chk, is_image, print_key, print_error,
                 add_args_imageviewer, add_args_output, add_args_specification
                 )
 from .. import ReturnMessage as RM
+from ..core.tree_index import Tree, split_name, build_index
 from pymeflib.tree2 import GC, branch_str, show_tree
 logger = getLogger(GLOBAL_CONF.logname)
 
@@ -22,55 +23,33 @@ def get_pwd():
     return pwd.encode()
 
 
-def get_contents(zip_file, path):
-    if str(path) == '.':
-        cpath = ''
-        lenpath = 0
-    else:
-        cpath = str(path)
-        if not cpath.endswith('/'):
-            cpath += '/'
-        lenpath = len(cpath)
-    files = []
-    dirs = []
-    for z in zip_file.infolist():
-        # dir name ends with /
-        if lenpath != 0:
-            if z.filename[:-1] == cpath:
-                continue
-            if not z.filename.startswith(cpath):
-                continue
-        zname = z.filename[lenpath:]
-        if zname.endswith('/'):
-            zname = zname[:-1]
-        if z.filename == str(cpath):
-            continue
-        if '/' in zname:
-            # in some case, directories are not listed?
-            tmp_dir = zname.split('/')[0]
-            if tmp_dir not in dirs:
-                dirs.append(tmp_dir)
-        elif z.is_dir():
-            if zname not in dirs:
-                dirs.append(zname)
-        else:
-            files.append(zname)
-    dirs.sort()
-    files.sort()
-    return dirs, files
+# item name (without the trailing "/") -> ZipInfo
+ZipInfos = Dict[str, zipfile.ZipInfo]
+
 
+def get_contents(tree: Tree, path: PurePosixPath):
+    cpath = str(path)
+    if cpath not in tree:
+        return [], []
+    dirs, files = tree[cpath]
+    return dirs.copy(), files.copy()
 
-def show_zip(zip_file: zipfile.ZipFile, pwd: Optional[bytes],
+
+def show_zip(zip_file: zipfile.ZipFile, tree: Tree, infos: ZipInfos,
+             pwd: Optional[bytes],
              tmpdir: Optional[tempfile.TemporaryDirectory],
              args: Args, get_contents: GC, cpath: str, **kwargs):
     res = []
-    try:
-        key_name = str(cpath)
-        if key_name+'/' in zip_file.namelist():
-            key_name += '/'
-        zipinfo = zip_file.getinfo(key_name)
-    except KeyError as e:
-        logger.error(f'failed to open [{cpath}]: {e}')
+    key_name = '/'.join(split_name(str(cpath)))
+    if key_name in infos:
+        zipinfo = infos[key_name]
+        is_dir = zipinfo.is_dir()
+    elif key_name in tree:
+        # directory without an explicit entry.
+        zipinfo = None
+        is_dir = True
+    else:
+        logger.error(f'failed to open [{cpath}]: not found in the archive')
         return RM(f'Error!! Cannot open {cpath}.', True)
 
     if args_chk(args, 'output') and args_chk(args, 'key'):
@@ -78,20 +57,19 @@ def show_zip(zip_file: zipfile.ZipFile, pwd: Optional[bytes],
         logger.info(f'out key: {cpath}')
         if not outpath.parent.is_dir():
             outpath.parent.mkdir(parents=True)
-        for item in zip_file.namelist():
-            logger.debug(f'checking;; {item}')
-            if cpath == item:
-                logger.info(f'  find1; {item}')
-                zip_file.extract(zip_file.getinfo(item), path=outpath, pwd=pwd)
-            elif cpath in [str(x) for x in PurePosixPath(item).parents]:
-                logger.info(f'  find2; {item}')
-                zip_file.extract(zip_file.getinfo(item), path=outpath, pwd=pwd)
+        for name, item in infos.items():
+            if key_name == name:
+                logger.info(f'  find1; {name}')
+                zip_file.extract(item, path=outpath, pwd=pwd)
+            elif name.startswith(f'{key_name}/'):
+                logger.info(f'  find2; {name}')
+                zip_file.extract(item, path=outpath, pwd=pwd)
         return RM(f'file is saved to {outpath/cpath}', False)
 
     assert tmpdir is not None, "something strange; tmpdir is not set."
-    if zipinfo.is_dir():
+    if is_dir:
         # directory
-        res.append('{}'.format(key_name))
+        res.append('{}/'.format(key_name))
         dirs, files = get_contents(key_name)
         for f in files:
             res.append('{}{}'.format(branch_str, f))
@@ -102,7 +80,7 @@ def show_zip(zip_file: zipfile.ZipFile, pwd: Optional[bytes],
         # file
         if 'system' in kwargs and kwargs['system']:
             zip_file.extract(zipinfo, path=tmpdir.name, pwd=pwd)
-            tmpfile = os.path.join(tmpdir.name, cpath)
+            tmpfile = os.path.join(tmpdir.name, zipinfo.filename)
             ret = run_system_cmd(tmpfile)
             if ret:
                 return RM('open {}'.format(cpath), False)
@@ -110,7 +88,7 @@ def show_zip(zip_file: zipfile.ZipFile, pwd: Optional[bytes],
                 return RM('Failed to open {}.'.format(cpath), True)
         elif is_image(key_name):
             zip_file.extract(zipinfo, path=tmpdir.name, pwd=pwd)
-            tmpfile = os.path.join(tmpdir.name, cpath)
+            tmpfile = os.path.join(tmpdir.name, zipinfo.filename)
             ret = show_image_file(tmpfile, args)
             if ret is None:
                 msg = 'image viewer not found.'
@@ -123,7 +101,7 @@ def show_zip(zip_file: zipfile.ZipFile, pwd: Optional[bytes],
 
         # text file?
         else:
-            for line in zip_file.open(key_name, 'r', pwd=pwd):
+            for line in zip_file.open(zipinfo, 'r', pwd=pwd):
                 try:
                     res.append(line.decode().replace("\n", ''))
                 except UnicodeDecodeError as e:
@@ -164,12 +142,16 @@ def main(fpath, args):
         tmpdir = None
         logger.debug('do not set tmp dir')
     fname = os.path.basename(fpath)
-    gc = partial(get_contents, zip_file)
+    tree, infos = build_index(zip_file.infolist(), lambda z: z.filename,
+                              zipfile.ZipInfo.is_dir)
+    # the disk cache is not used; ZipFile reads all the entries at open,
+    # and the index is made from them without reading the file.
+    gc = partial(get_contents, tree)
     if args.ask_password:
         pwd = get_pwd()
     else:
         pwd = None
-    sf = partial(show_zip, zip_file, pwd, tmpdir, args, gc)
+    sf = partial(show_zip, zip_file, tree, infos, pwd, tmpdir, args, gc)
 
     if args_chk(args, 'output'):
         if not args_chk(args, 'key') or len(args.key) == 0:
@@ -187,7 +169,7 @@ def main(fpath, args):
             return
         for k in args.key:
             print_key(k)
-            info = show_zip(zip_file, pwd, tmpdir, args, gc, k)
+            info = show_zip(zip_file, tree, infos, pwd, tmpdir, args, gc, k)
             if not info.error:
                 print(info.message)
                 print()
@@ -14,12 +14,14 @@ varis = {
 types = {
         '.core.types': ['Args', 'ReturnMessage',
                         ],
+        '.core.cache': ['ContentsCache'],
         }
 
 funcs = {
         '.core': ['args_chk', 'get_config', 'get_col',
                   'cprint', 'print_key', 'print_error', 'print_warning',
                   'set_numpy_format', 'interactive_view', 'run_system_cmd',
+                  'limited_pformat', 'cache_show_func',
                   ],
         '.core.image_viewer': ['is_image',
                                'show_image_file', 'show_image_ndarray',